@@ -0,0 +1,79 @@
+import queue
+import threading
+
+
+class AudioRingBuffer:
+    """Byte ring buffer between the resampler thread and the STT sender.
+
+    Drop-in for the ``queue.Queue`` the STT providers read from
+    (``put_nowait`` / ``get`` / ``get_nowait``, raising ``queue.Full`` and
+    ``queue.Empty``), but chunks are copied into one preallocated
+    ``bytearray`` and a read returns everything buffered (up to
+    ``max_read`` bytes) in one piece.
+
+    The writer only advances ``_tail`` and the reader only advances
+    ``_head``, so the two sides never wait on each other. Each side has its
+    own lock, which is uncontended in steady state and only matters if two
+    writers or two readers briefly overlap (e.g. while switching STT
+    provider).
+    """
+
+    def __init__(self, capacity: int = 8 * 1024 * 1024, max_read: int = 25600):
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self._capacity = capacity
+        self.max_read = max_read
+        self._head = 0  # total bytes consumed
+        self._tail = 0  # total bytes produced
+        self._read_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._data_ready = threading.Event()
+
+    def qsize(self) -> int:
+        """Number of buffered bytes."""
+        return self._tail - self._head
+
+    def put_nowait(self, data: bytes):
+        n = len(data)
+        with self._write_lock:
+            tail = self._tail
+            if n > self._capacity - (tail - self._head):
+                raise queue.Full
+            pos = tail % self._capacity
+            first = min(n, self._capacity - pos)
+            self._view[pos:pos + first] = data[:first]
+            if first < n:
+                self._view[:n - first] = data[first:]
+            self._tail = tail + n
+        if not self._data_ready.is_set():
+            self._data_ready.set()
+
+    def get_nowait(self) -> bytes:
+        with self._read_lock:
+            head = self._head
+            n = min(self._tail - head, self.max_read)
+            if n <= 0:
+                raise queue.Empty
+            pos = head % self._capacity
+            first = min(n, self._capacity - pos)
+            if first < n:
+                data = bytes(self._view[pos:]) + bytes(self._view[:n - first])
+            else:
+                data = bytes(self._view[pos:pos + n])
+            self._head = head + n
+            return data
+
+    def get(self, timeout: float | None = None) -> bytes:
+        try:
+            return self.get_nowait()
+        except queue.Empty:
+            pass
+        self._data_ready.clear()
+        # Re-check after clearing so a put that landed in between isn't missed.
+        try:
+            return self.get_nowait()
+        except queue.Empty:
+            pass
+        if not self._data_ready.wait(timeout):
+            raise queue.Empty
+        return self.get_nowait()
@@ -30,6 +30,8 @@ def build():
         "--hidden-import", "rapidfuzz",
         "--hidden-import", "websocket",
         "--hidden-import", "anthropic",
+        "--hidden-import", "tiktoken_ext.openai_public",
+        "--hidden-import", "h2",
         "--hidden-import", "PIL",
         "--hidden-import", "numpy",
         "--collect-all", "google.cloud.speech_v2",
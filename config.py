@@ -1,9 +1,27 @@
 import os
+from collections.abc import Mapping
 from dataclasses import dataclass, field
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Env vars each STT provider needs; any provider other than "deepgram" is Google.
+REQUIRED_ENV = {
+    "deepgram": ("DEEPGRAM_API_KEY",),
+    "google": ("GCP_PROJECT_ID", "GOOGLE_APPLICATION_CREDENTIALS"),
+}
+COMMON_REQUIRED_ENV = ("OPENAI_API_KEY",)
+
+
+def required_env(stt_provider: str) -> tuple[str, ...]:
+    """Env vars required for the given STT provider, in display order."""
+    return REQUIRED_ENV.get(stt_provider, REQUIRED_ENV["google"]) + COMMON_REQUIRED_ENV
+
+
+def compute_missing(env: Mapping[str, str]) -> set[str]:
+    """Required env vars that are unset or empty in env."""
+    return {key for key in required_env(env.get("STT_PROVIDER", "deepgram")) if not env.get(key)}
+
 
 @dataclass
 class Config:
@@ -21,6 +39,14 @@ class Config:
 
     anthropic_api_key: str = os.getenv("ANTHROPIC_API_KEY", "")
     anthropic_model: str = "claude-sonnet-4-5-20250929"
+    refiner_prompt_warmup: bool = False
+    # Skip the LLM for segments that look like plain Korean. Off by default:
+    # the check can't see misheard terms or transliterations missing from
+    # the dictionary, which then reach the notes unfixed.
+    refiner_local_shortcut: bool = False
+    polish_batch_api: bool = False
+    polish_batch_timeout_sec: float = 600.0
+    refiner_max_concurrency: int = 8
 
     audio_chunk_duration_ms: int = 100
 
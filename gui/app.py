@@ -6,8 +6,17 @@ import logging
 
 from PIL import Image, ImageTk
 
+from config import compute_missing, required_env
+
 logger = logging.getLogger(__name__)
 
+_ENV_PLACEHOLDERS = {
+    "DEEPGRAM_API_KEY": "your-deepgram-api-key",
+    "GCP_PROJECT_ID": "your-project-id",
+    "GOOGLE_APPLICATION_CREDENTIALS": "path/to/service-account.json",
+    "OPENAI_API_KEY": "your-openai-api-key",
+}
+
 _C = {
     "header":      "#1B2A4A",
     "header_text": "#FFFFFF",
@@ -52,18 +61,12 @@ class NoteTakingGUI:
         self._check_env()
 
     def _check_env(self):
-        missing = []
-        stt_provider = os.getenv("STT_PROVIDER", "deepgram")
-        if stt_provider == "deepgram":
-            if not os.getenv("DEEPGRAM_API_KEY"):
-                missing.append("DEEPGRAM_API_KEY=your-deepgram-api-key")
-        else:
-            if not os.getenv("GCP_PROJECT_ID"):
-                missing.append("GCP_PROJECT_ID=your-project-id")
-            if not os.getenv("GOOGLE_APPLICATION_CREDENTIALS"):
-                missing.append("GOOGLE_APPLICATION_CREDENTIALS=path/to/service-account.json")
-        if not os.getenv("OPENAI_API_KEY"):
-            missing.append("OPENAI_API_KEY=your-openai-api-key")
+        missing_keys = compute_missing(os.environ)
+        missing = [
+            f"{key}={_ENV_PLACEHOLDERS[key]}"
+            for key in required_env(os.getenv("STT_PROVIDER", "deepgram"))
+            if key in missing_keys
+        ]
 
         if missing:
             messagebox.showwarning(
@@ -4,6 +4,10 @@ import threading
 import logging
 import sys
 import time
+from bisect import bisect_right
+from collections import deque
+from collections.abc import Sequence
+from operator import itemgetter
 
 from PIL import Image
 
@@ -22,6 +26,7 @@ if sys.platform == "win32":
 from config import Config
 from audio.capture import AudioCapture
 from audio.resampler import AudioResampler
+from audio.ring import AudioRingBuffer
 from stt.streaming import StreamingSTT
 from stt.transcript import TranscriptBuffer
 from stt.postprocess import TranscriptPostProcessor
@@ -40,6 +45,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Final transcripts below NOISE are dropped; below REFINE they are shown
+# but not sent to the LLM refiner.
+CONFIDENCE_NOISE = 0.15
+CONFIDENCE_REFINE = 0.4
+
 
 class LectureNotetaker:
     """Main orchestrator: screen capture + audio → notes + highlighted transcript → PDF."""
@@ -47,14 +57,16 @@ class LectureNotetaker:
     def __init__(self):
         self.config = Config()
         self.audio_queue = queue.Queue(maxsize=1000)
-        self.resampled_queue = queue.Queue(maxsize=1000)
+        self.resampled_queue = AudioRingBuffer()
         self.transcript_buffer = TranscriptBuffer()
         self.postprocessor = TranscriptPostProcessor()
         self.current_slide = -1
         self.total_slides = 0
         self._running = False
         self._write_lock = threading.Lock()
-        self._slide_timeline: list[tuple[float, int]] = []
+        # Recent (change_time, slide_idx) pairs in time order. Utterances are
+        # only ever a few seconds old, so older slide changes are dropped.
+        self._slide_timeline: deque[tuple[float, int]] = deque(maxlen=128)
         self._slide_grace_sec = 5.0
 
         self.slide_images: dict[int, Image.Image] = {}
@@ -181,6 +193,9 @@ class LectureNotetaker:
 
         threading.Thread(target=_resample_worker, daemon=True).start()
 
+        if self.config.refiner_prompt_warmup:
+            threading.Thread(target=self.refiner.warm_prompt_cache, daemon=True).start()
+
         if self.config.stt_provider == "deepgram" and self.config.deepgram_api_key:
             from stt.deepgram_streaming import DeepgramStreamingSTT
             self.stt = DeepgramStreamingSTT(
@@ -248,7 +263,7 @@ class LectureNotetaker:
 
         threading.Thread(target=_analyze, daemon=True).start()
 
-    def _compute_slide_for_utterance(self, words: list[tuple[str, float, float]] | None) -> int:
+    def _compute_slide_for_utterance(self, words: Sequence[tuple[str, float, float]] | None) -> int:
         """Determine which slide an utterance belongs to using word timestamps.
 
         Uses the median word timestamp to find which slide was active when
@@ -268,12 +283,9 @@ class LectureNotetaker:
         mid_idx = len(words) // 2
         median_time = words[mid_idx][1]
 
-        assigned_slide = 0
-        for change_time, slide_idx_at_change in self._slide_timeline:
-            if median_time >= change_time:
-                assigned_slide = slide_idx_at_change
-            else:
-                break
+        # Last slide change at or before the median word.
+        pos = bisect_right(self._slide_timeline, median_time, key=itemgetter(0))
+        assigned_slide = self._slide_timeline[pos - 1][1] if pos else 0
 
         assigned_slide = min(assigned_slide, idx)
         if assigned_slide != idx:
@@ -284,7 +296,7 @@ class LectureNotetaker:
         return assigned_slide
 
     def _on_transcript(self, text: str, is_final: bool,
-                       words: list[tuple[str, float, float]] | None = None,
+                       words: Sequence[tuple[str, float, float]] | None = None,
                        confidence: float = 1.0):
         """Transcript callback with word timestamps and confidence.
 
@@ -296,7 +308,7 @@ class LectureNotetaker:
         Bottom-right (REFINED): LLM-refined with English terms.
         """
         if is_final:
-            if confidence < 0.15:
+            if confidence < CONFIDENCE_NOISE:
                 logger.debug("Skipping noise: confidence=%.2f text='%s'", confidence, text[:50])
                 return
 
@@ -310,7 +322,7 @@ class LectureNotetaker:
 
             self.transcript_buffer.add_segment(corrected, slide_idx, True)
 
-            if confidence < 0.4:
+            if confidence < CONFIDENCE_REFINE:
                 logger.info("Low confidence (%.2f), skipping refinement: '%s'", confidence, text[:50])
                 self.gui.refined_append(corrected, slide_idx)
                 self.refined_texts.setdefault(slide_idx, []).append(corrected)
@@ -439,7 +451,7 @@ class LectureNotetaker:
         """Export all captured slides + transcript to PDF."""
         def _export():
             try:
-                slides_data = []
+                pending = []
                 for slide_idx in range(self.total_slides):
                     image = self.slide_pdf_images.get(slide_idx) or self.slide_images.get(slide_idx)
                     if not image:
@@ -452,17 +464,25 @@ class LectureNotetaker:
                         transcript_text = self.transcript_buffer.get_archived_text(slide_idx)
 
                     context = self._get_screen_context(slide_idx, transcript_text)
+                    pending.append((slide_idx, image, transcript_text, context))
 
-                    self.gui.update_status(
-                        f"Polishing slide {slide_idx + 1}/{self.total_slides}..."
+                self.gui.update_status(f"Polishing and summarizing {len(pending)} slides...")
+                if self.config.polish_batch_api:
+                    polished = self.refiner.polish_batch(
+                        [(text, context) for _, _, text, context in pending],
+                        timeout_sec=self.config.polish_batch_timeout_sec,
                     )
-                    polished_text = self.refiner.polish(transcript_text, context)
-
-                    self.gui.update_status(
-                        f"Summarizing slide {slide_idx + 1}/{self.total_slides}..."
+                    notes = [
+                        (text, self.refiner.summarize(text, context))
+                        for (_, _, _, context), text in zip(pending, polished)
+                    ]
+                else:
+                    notes = self.refiner.polish_and_summarize_all(
+                        [(slide_idx, text, context) for slide_idx, _, text, context in pending]
                     )
-                    summary_bullets = self.refiner.summarize(polished_text, context)
 
+                slides_data = []
+                for (slide_idx, image, _, _), (polished_text, summary_bullets) in zip(pending, notes):
                     slides_data.append(SlideData(
                         slide_num=slide_idx,
                         image=image,
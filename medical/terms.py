@@ -7,6 +7,9 @@ Boost values: 10 = moderate boost, 20 = strong boost.
 Users can add custom terms by editing this file.
 """
 
+import functools
+import threading
+
 PATHOLOGY_TERMS_KO = [
     ("심근경색", 20), ("뇌경색", 20), ("폐색전증", 20),
     ("동맥경화", 20), ("혈전", 15), ("색전", 15),
@@ -349,38 +352,78 @@ CLINICAL_TERMS_EN = [
 ]
 
 
-import threading
-
-_dynamic_terms: list[tuple[str, int]] = []
+# Copy-on-write: writers rebuild the tuple under _lock and rebind it in one
+# assignment, so readers just load the module attribute without locking.
+# _dynamic_names is published the same way so known terms are rejected
+# before taking the lock.
+_dynamic_terms: tuple[tuple[str, int], ...] = ()
+_dynamic_names: frozenset[str] = frozenset()
 _lock = threading.Lock()
 
 
 def add_dynamic_terms(terms: list[str], boost: int = 15):
-    """Add terms discovered from screen content at runtime. Thread-safe."""
+    """Add terms discovered from screen content at runtime. Thread-safe.
+
+    Re-adding terms that are already known (the usual case when the same
+    slide is analyzed again) returns without locking.
+    """
+    global _dynamic_terms, _dynamic_names
+    known = _dynamic_names
+    candidates = [term for term in map(str.strip, terms)
+                  if len(term) >= 2 and term not in known]
+    if not candidates:
+        return
     with _lock:
-        existing = {t for t, _ in _dynamic_terms}
-        for term in terms:
-            term = term.strip()
-            if term and len(term) >= 2 and term not in existing:
-                _dynamic_terms.append((term, boost))
-                existing.add(term)
+        names = set(_dynamic_names)
+        added = []
+        for term in candidates:
+            if term not in names:
+                added.append((term, boost))
+                names.add(term)
+        if added:
+            _dynamic_terms = _dynamic_terms + tuple(added)
+            _dynamic_names = frozenset(names)
 
 
-def get_dynamic_terms() -> list[tuple[str, int]]:
-    """Return dynamically added terms. Thread-safe."""
+def clear_dynamic_terms():
+    """Forget all runtime-added terms. Thread-safe."""
+    global _dynamic_terms, _dynamic_names
     with _lock:
-        return list(_dynamic_terms)
+        _dynamic_terms = ()
+        _dynamic_names = frozenset()
+
+
+def get_dynamic_terms() -> tuple[tuple[str, int], ...]:
+    """Return dynamically added terms. Lock-free; the tuple is never mutated."""
+    return _dynamic_terms
 
 
-def get_all_medical_terms() -> list[tuple[str, int]]:
-    """Return all medical terms (static + dynamic) with their boost values."""
-    all_terms = []
+@functools.lru_cache(maxsize=1)
+def get_static_medical_terms() -> tuple[tuple[str, int], ...]:
+    """Return the built-in medical terms. Computed once; the lists are fixed at import."""
+    static_terms = []
     for var_name, var_val in globals().items():
         if var_name.endswith(("_TERMS_KO", "_TERMS_EN")):
-            all_terms.extend(var_val)
-    with _lock:
-        all_terms.extend(_dynamic_terms)
-    return all_terms
+            static_terms.extend(var_val)
+    return tuple(static_terms)
+
+
+_all_terms_cache: tuple | None = None  # (dynamic tuple it was built from, merged terms)
+
+
+def get_all_medical_terms() -> tuple[tuple[str, int], ...]:
+    """Return all medical terms (static + dynamic) with their boost values.
+
+    The merged tuple is rebuilt only after the dynamic terms change; every
+    write publishes a new _dynamic_terms object, so its identity is the key.
+    """
+    global _all_terms_cache
+    dynamic = _dynamic_terms
+    cache = _all_terms_cache
+    if cache is None or cache[0] is not dynamic:
+        cache = (dynamic, get_static_medical_terms() + dynamic)
+        _all_terms_cache = cache
+    return cache[1]
 
 
 def format_for_deepgram() -> list[str]:
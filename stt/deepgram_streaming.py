@@ -3,11 +3,59 @@ import logging
 import queue
 import threading
 import time
+from collections.abc import Sequence
 
 import websocket
 
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
 logger = logging.getLogger(__name__)
 
+# Only the sample rate varies between connections.
+_LISTEN_URL = (
+    "wss://api.deepgram.com/v1/listen?"
+    "model=nova-2"
+    "&language=ko"
+    "&encoding=linear16"
+    "&sample_rate={sample_rate}"
+    "&channels=1"
+    "&interim_results=true"
+    "&smart_format=true"
+    "&punctuate=true"
+    "&endpointing=300"
+    "&utterance_end_ms=1200"
+    "&filler_words=false"
+    "&words=true"
+)
+
+
+class _WordTimes(Sequence):
+    """``(word, start, end)`` view of Deepgram's word dicts on the monotonic clock.
+
+    Tuples are built only for the words actually read (slide assignment looks
+    at one), instead of for every word of every final message.
+    """
+
+    __slots__ = ("_raw", "_offset")
+
+    def __init__(self, raw_words: list[dict], offset: float):
+        self._raw = raw_words
+        self._offset = offset
+
+    def __len__(self) -> int:
+        return len(self._raw)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        w = self._raw[index]
+        return (w.get("word", ""),
+                self._offset + w.get("start", 0),
+                self._offset + w.get("end", 0))
+
 
 class DeepgramStreamingSTT:
     """Low-latency streaming STT using Deepgram Nova-2 via WebSocket.
@@ -34,21 +82,7 @@ class DeepgramStreamingSTT:
         self._restart_requested = False
 
     def _build_url(self):
-        params = (
-            f"model=nova-2"
-            f"&language=ko"
-            f"&encoding=linear16"
-            f"&sample_rate={self.sample_rate}"
-            f"&channels=1"
-            f"&interim_results=true"
-            f"&smart_format=true"
-            f"&punctuate=true"
-            f"&endpointing=300"
-            f"&utterance_end_ms=1200"
-            f"&filler_words=false"
-            f"&words=true"
-        )
-        return f"wss://api.deepgram.com/v1/listen?{params}"
+        return _LISTEN_URL.format(sample_rate=self.sample_rate)
 
     def _on_open(self, ws):
         self._stream_start_mono = time.monotonic()
@@ -58,7 +92,7 @@ class DeepgramStreamingSTT:
 
     def _on_message(self, ws, message):
         try:
-            data = json.loads(message)
+            data = _json_loads(message)
 
             msg_type = data.get("type", "")
             if msg_type in ("UtteranceEnd", "Metadata"):
@@ -77,14 +111,10 @@ class DeepgramStreamingSTT:
                     confidence = alt.get("confidence", 1.0)
 
                     words_data = None
-                    raw_words = alt.get("words", [])
-                    if raw_words and self._stream_start_mono > 0:
-                        words_data = [
-                            (w.get("word", ""),
-                             self._stream_start_mono + w.get("start", 0),
-                             self._stream_start_mono + w.get("end", 0))
-                            for w in raw_words
-                        ]
+                    raw_words = alt.get("words")
+                    start_mono = self._stream_start_mono
+                    if raw_words and start_mono > 0:
+                        words_data = _WordTimes(raw_words, start_mono)
 
                     self.on_transcript(
                         transcript, is_final,
@@ -162,9 +192,13 @@ class DeepgramStreamingSTT:
             on_error=self._on_error,
             on_close=self._on_close,
         )
+        # Text frames reach _on_message as raw bytes: websocket-client's own
+        # UTF-8 check is pure Python (~0.75 ms per frame without wsaccel),
+        # and the JSON parser validates the encoding anyway.
         threading.Thread(
             target=self._ws.run_forever, daemon=True,
-            kwargs={"ping_interval": 20, "ping_timeout": 10},
+            kwargs={"ping_interval": 20, "ping_timeout": 10,
+                    "skip_utf8_validation": True},
         ).start()
 
     def start(self):
@@ -9,6 +9,10 @@ Terms are organized by category. Each dict maps "한글음역" → "English".
 Longer phrases are matched first to avoid partial replacement issues.
 """
 
+import functools
+from collections.abc import Mapping
+from types import MappingProxyType
+
 ACADEMIC_TERMS = {
     "시스테매틱 리뷰": "systematic review",
     "메타 아날리시스": "meta-analysis",
@@ -774,8 +778,9 @@ PULMONOLOGY_TERMS = {
 }
 
 
-def get_builtin_korean_to_english() -> dict[str, str]:
-    """Return all built-in Korean phonetic → English mappings combined."""
+@functools.lru_cache(maxsize=1)
+def get_builtin_korean_to_english() -> Mapping[str, str]:
+    """Return all built-in Korean phonetic → English mappings combined (read-only, cached)."""
     combined = {}
     for d in [
         ACADEMIC_TERMS,
@@ -794,4 +799,4 @@ def get_builtin_korean_to_english() -> dict[str, str]:
         PULMONOLOGY_TERMS,
     ]:
         combined.update(d)
-    return combined
+    return MappingProxyType(combined)
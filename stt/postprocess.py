@@ -25,18 +25,15 @@ class TranscriptPostProcessor:
     """
 
     def __init__(self):
-        self._ko_corrections: list[tuple[re.Pattern, str]] = []
-        for wrong, correct in sorted(_KOREAN_CORRECTIONS.items(),
-                                      key=lambda x: len(x[0]), reverse=True):
-            self._ko_corrections.append(
-                (re.compile(re.escape(wrong)), correct)
-            )
+        # One alternation, longest first, so each text is scanned once.
+        self._ko_pattern = re.compile("|".join(
+            re.escape(wrong)
+            for wrong in sorted(_KOREAN_CORRECTIONS, key=len, reverse=True)
+        ))
 
     def process(self, text: str) -> str:
         """Apply Korean→Korean STT corrections only.
 
         Korean→English conversion is handled by the LLM refiner.
         """
-        for pattern, correct in self._ko_corrections:
-            text = pattern.sub(correct, text)
-        return text
+        return self._ko_pattern.sub(lambda m: _KOREAN_CORRECTIONS[m.group()], text)
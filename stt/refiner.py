@@ -6,12 +6,30 @@ Takes raw transcript + slide screen context and produces refined text where:
 - Medical/academic terminology corrected using screen context
 """
 
+import asyncio
+import hashlib
+import importlib.util
+import json
 import logging
+import random
+import re
 import threading
 import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Iterator
 
-from anthropic import Anthropic
-from openai import OpenAI
+import anthropic
+import httpx
+import openai
+from anthropic import Anthropic, AsyncAnthropic
+from openai import AsyncOpenAI, OpenAI
+
+from stt.korean_dict import get_builtin_korean_to_english
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
 
 logger = logging.getLogger(__name__)
 
@@ -95,6 +113,17 @@ the speaker was trying to say, NOT to add information they didn't say.
 - If the input is already clean, return it EXACTLY as-is."""
 
 
+BATCH_REFINE_PROMPT = REFINE_PROMPT + """
+
+═══ BATCHED INPUT ═══
+The input contains several independent transcripts, each starting with a
+"### BATCH <n>" header followed by its own slide context. Refine each one
+separately, using only its own slide context. Output every result under the
+same "### BATCH <n>" header, in the same order. Output nothing else."""
+
+_BATCH_HEADER = re.compile(r"^### BATCH (\d+)[^\n]*\n?", re.MULTILINE)
+
+
 FINALIZE_PROMPT = """You are a final proofreader for Korean medical lecture notes.
 
 The text below was transcribed and refined in small batches. Do a LIGHT final
@@ -181,200 +210,856 @@ Output bullet points ONLY, one per line. No numbering, no bullet markers,
 no headers, no explanations."""
 
 
+# Deterministic STT fixups applied locally before (or instead of) the LLM.
+_STRAY_PERIOD = re.compile(r"(?<=[은는이가을를의에와과도로])\.\s+(?=[가-힣])")
+_DOUBLE_PUNCT = re.compile(r"([.,?!])\1+")
+_COMMA_PERIOD = re.compile(r",\s*\.")
+_SPACE_BEFORE_PUNCT = re.compile(r"\s+([.,?!])")
+_MULTI_SPACE = re.compile(r"[ \t]{2,}")
+
+# Anything that still needs the LLM: Latin letters (garbled English), symbols
+# outside the safelist, spoken numbers/units, and stutters.
+_NEEDS_LLM = re.compile(
+    r"[A-Za-z]"
+    r"|[^가-힣0-9\s.,?!%~()'\"-]"
+    r"|[영일이삼사오육칠팔구십백천만]\s*(?:점|십|백|천|만|퍼센트|프로)"
+    r"|(?<![가-힣])[일이삼사오육칠팔구]?\s*[십백천만]\s*"
+    r"(?:명|개|번|회|배|살|세|년|개월|주|일|시간|분|초|도|차|건|례)"
+    r"|밀리|센티|나노|마이크로|킬로|피코"
+    r"|(\b\S+)\s+\1\b"
+)
+_TRANSLITERATION = re.compile("|".join(
+    re.escape(term).replace(r"\ ", r"\s*")
+    for term in sorted(get_builtin_korean_to_english(), key=len, reverse=True)
+))
+_CONTEXT_MAPPING_KEY = re.compile(r"^\s+(.+?) → ", re.MULTILINE)
+
+
+def _apply_local_fixups(text: str) -> str:
+    """Stray periods after particles, doubled punctuation, spacing."""
+    text = _STRAY_PERIOD.sub(" ", text)
+    text = _DOUBLE_PUNCT.sub(r"\1", text)
+    text = _COMMA_PERIOD.sub(".", text)
+    text = _SPACE_BEFORE_PUNCT.sub(r"\1", text)
+    return _MULTI_SPACE.sub(" ", text).strip()
+
+
+def _local_refine(transcript: str, screen_context: str) -> str | None:
+    """Return the locally cleaned transcript if the LLM has nothing to do.
+
+    Only plain Korean with no transliterations (built-in dictionary or the
+    slide's own Korean→English mappings), spoken numbers or stutters
+    qualifies; otherwise returns None.
+    """
+    cleaned = _apply_local_fixups(transcript)
+    if _NEEDS_LLM.search(cleaned) or _TRANSLITERATION.search(cleaned):
+        return None
+    for key in _CONTEXT_MAPPING_KEY.findall(screen_context):
+        if key in cleaned:
+            return None
+    return cleaned
+
+
+RESPONSE_CACHE_MAX_ENTRIES = 1000
+
+
+def _normalize_for_cache(text: str) -> str:
+    """Collapse whitespace so trivially different segments share a cache key."""
+    return " ".join(text.split())
+
+
+def _anthropic_cached_system(prompt: str) -> list[dict]:
+    """Wrap a static system prompt as an Anthropic prompt-cache breakpoint."""
+    return [{"type": "text", "text": prompt, "cache_control": {"type": "ephemeral"}}]
+
+
+# Built once and never mutated: every call sends the identical system message.
+_REFINE_SYSTEM = {"role": "system", "content": REFINE_PROMPT}
+_BATCH_REFINE_SYSTEM = {"role": "system", "content": BATCH_REFINE_PROMPT}
+_FINALIZE_SYSTEM = {"role": "system", "content": FINALIZE_PROMPT}
+_POLISH_SYSTEM = {"role": "system", "content": POLISH_PROMPT}
+_SUMMARY_SYSTEM = {"role": "system", "content": SUMMARY_PROMPT}
+_POLISH_SYSTEM_ANTHROPIC = _anthropic_cached_system(POLISH_PROMPT)
+
+_CONTEXT_PREFIX = "Slide context:\n"
+_TRANSCRIPT_PREFIX = "Transcript:\n"
+_TEXT_PREFIX = "Text:\n"
+_POLISH_CONTEXT_PREFIX = "[슬라이드 context]\n"
+_POLISH_TRANSCRIPT_PREFIX = "\n\n[강의 transcript]\n"
+
+BATCH_POLL_INTERVAL_SEC = 10.0
+
+# Below SUMMARY_MIN_CHARS (or SUMMARY_MIN_SPACES words) there is nothing to
+# summarize; up to SUMMARY_LLM_MIN_CHARS the transcript's own sentences are
+# used as bullets instead of calling the model.
+SUMMARY_MIN_CHARS = 80
+SUMMARY_MIN_SPACES = 10
+SUMMARY_LLM_MIN_CHARS = 500
+SUMMARY_MAX_BULLETS = 7
+
+# One pooled HTTP client is shared by the OpenAI and Anthropic SDKs, using
+# HTTP/2 multiplexing when h2 is installed. Its timeout matches the SDKs'
+# 600 s default, since batch refines, summaries and Batch API downloads can
+# legitimately take minutes. Streaming calls override it per request with
+# STREAM_TIMEOUT: a healthy stream never goes that long between chunks.
+HTTP_MAX_CONNECTIONS = 64
+HTTP_MAX_KEEPALIVE = 32
+HTTP_TIMEOUT_SEC = 600.0
+HTTP_CONNECT_TIMEOUT_SEC = 10.0
+STREAM_TIMEOUT = httpx.Timeout(60.0, connect=HTTP_CONNECT_TIMEOUT_SEC)
+
+RATE_LIMIT_MAX_RETRIES = 5
+RATE_LIMIT_ERRORS = (openai.RateLimitError, anthropic.RateLimitError)
+
+
+def _user_message(body_prefix: str, transcript: str, screen_context: str) -> dict:
+    """Build the user message: optional slide context, then the transcript."""
+    if screen_context:
+        content = "".join((_CONTEXT_PREFIX, screen_context, "\n\n", body_prefix, transcript))
+    else:
+        content = body_prefix + transcript
+    return {"role": "user", "content": content}
+
+
+def _rate_limit_delay(attempt: int) -> float:
+    """Exponential backoff with +/-50% jitter, capped at 30 s."""
+    return min(2 ** attempt, 30) * random.uniform(0.5, 1.5)
+
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def _local_summary(transcript: str) -> list[str] | None:
+    """Bullets for transcripts too short to be worth an LLM call, else None."""
+    stripped = transcript.strip()
+    if len(stripped) < SUMMARY_MIN_CHARS or stripped.count(" ") < SUMMARY_MIN_SPACES:
+        return []
+    if len(stripped) > SUMMARY_LLM_MIN_CHARS:
+        return None
+    sentences = (s.strip().rstrip(".") for s in _SENTENCE_END.split(stripped))
+    return [s for s in sentences if s][:SUMMARY_MAX_BULLETS]
+
+
+def _parse_bullets(result: str | None) -> list[str]:
+    """Split a summary response into bullet strings, dropping markers and blanks."""
+    bullets = [line.strip().lstrip("•-·* ") for line in (result or "").split("\n")]
+    return [b for b in bullets if b]
+
+
+def _http_client_kwargs() -> dict:
+    return {
+        "http2": importlib.util.find_spec("h2") is not None,
+        "limits": httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        ),
+        "timeout": httpx.Timeout(HTTP_TIMEOUT_SEC, connect=HTTP_CONNECT_TIMEOUT_SEC),
+    }
+
+
 class TranscriptRefiner:
     """Refines transcript segments using OpenAI, with slide context.
 
     Uses Anthropic Claude for the polish step (PDF export) if configured.
+
+    System prompts are sent verbatim on every call (slide context always goes
+    in the user message) so both providers can reuse their prompt caches.
     """
 
     def __init__(self, config):
-        self.client = OpenAI(api_key=config.openai_api_key)
+        self._http = httpx.Client(**_http_client_kwargs())
+        self._async_http = httpx.AsyncClient(**_http_client_kwargs())
+
+        self.client = OpenAI(api_key=config.openai_api_key, http_client=self._http)
+        self.async_client = AsyncOpenAI(
+            api_key=config.openai_api_key, http_client=self._async_http,
+        )
         self.model = config.openai_model_writer
+        self.max_concurrency = config.refiner_max_concurrency
+        self.local_shortcut = config.refiner_local_shortcut
         self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        # Loaded in the background on first use: the first load can download
+        # the BPE file, which must not block GUI startup.
+        self._enc = None
+        self._enc_requested = False
+        # key -> result, in LRU order
+        self._response_cache: OrderedDict[str, object] = OrderedDict()
 
         if config.anthropic_api_key:
-            self.anthropic = Anthropic(api_key=config.anthropic_api_key)
+            self.anthropic = Anthropic(api_key=config.anthropic_api_key, http_client=self._http)
+            self.async_anthropic = AsyncAnthropic(
+                api_key=config.anthropic_api_key, http_client=self._async_http,
+            )
             self.anthropic_model = config.anthropic_model
         else:
             self.anthropic = None
+            self.async_anthropic = None
             self.anthropic_model = None
 
+    def warm_prompt_cache(self):
+        """Send the refine prompt once so the first live segments hit the prefix cache.
+
+        Only refine runs during capture; polish and summary run at export,
+        long after a warmed prefix would have expired.
+        """
+        try:
+            self.client.chat.completions.create(
+                model=self.model,
+                messages=[_REFINE_SYSTEM, {"role": "user", "content": "."}],
+                max_tokens=1,
+            )
+        except Exception as e:
+            logger.debug("Prompt cache warm-up failed: %s", e)
+
+    def _output_budget(self, transcript: str, token_ratio: float, char_ratio: float,
+                       floor: int, cap: int) -> int:
+        """max_tokens for a length-preserving rewrite of transcript.
+
+        Uses the model's tokenizer once it has loaded; until then (or if
+        tiktoken is missing or fails to load) falls back to the
+        character-length heuristic.
+        """
+        enc = self._enc
+        if enc is not None:
+            n = len(enc.encode(transcript))
+            return min(cap, int(n * token_ratio) + 64)
+        self._request_encoder()
+        return min(cap, max(floor, int(len(transcript) * char_ratio)))
+
+    def _request_encoder(self):
+        """Start loading the tokenizer on a daemon thread (once)."""
+        if tiktoken is None:
+            return
+        with self._lock:
+            if self._enc_requested:
+                return
+            self._enc_requested = True
+        threading.Thread(target=self._load_encoder, daemon=True).start()
+
+    def _load_encoder(self):
+        try:
+            self._enc = tiktoken.encoding_for_model(self.model)
+        except Exception as e:
+            logger.debug("tiktoken unavailable for %s: %s", self.model, e)
+
+    def _cache_key(self, kind: str, normalized: str, context_hash: str) -> str:
+        h = hashlib.sha256()
+        for part in (kind, self.model, context_hash, normalized):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def _cache_get(self, kind: str, transcript: str, screen_context: str):
+        """Return the cached response for the same normalized text and slide context.
+
+        Only exact hits count: lecture lines that differ by one numeral or a
+        negation are near-identical as strings but must not share a result.
+        """
+        key = self._cache_key_for(kind, transcript, screen_context)
+        with self._lock:
+            result = self._response_cache.get(key)
+            if result is not None:
+                self._response_cache.move_to_end(key)
+            return result
+
+    def _cache_key_for(self, kind: str, transcript: str, screen_context: str) -> str:
+        context_hash = hashlib.sha256(screen_context.encode("utf-8")).hexdigest()
+        return self._cache_key(kind, _normalize_for_cache(transcript), context_hash)
+
+    def _cache_put(self, kind: str, transcript: str, screen_context: str, result):
+        key = self._cache_key_for(kind, transcript, screen_context)
+        with self._lock:
+            self._response_cache[key] = result
+            self._response_cache.move_to_end(key)
+            while len(self._response_cache) > RESPONSE_CACHE_MAX_ENTRIES:
+                self._response_cache.popitem(last=False)
+
+    def _stream_openai(self, system_msg: dict, user_msg: dict, temperature: float,
+                       max_tokens: int) -> Iterator[str]:
+        """Yield text deltas from a streaming OpenAI chat completion."""
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=[system_msg, user_msg],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            timeout=STREAM_TIMEOUT,
+        )
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            stream.close()
+
+    def _stream_anthropic(self, system: list[dict], user_msg: dict, temperature: float,
+                          max_tokens: int) -> Iterator[str]:
+        """Yield text deltas from a streaming Anthropic message."""
+        with self.anthropic.messages.stream(
+            model=self.anthropic_model,
+            system=system,
+            messages=[user_msg],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=STREAM_TIMEOUT,
+        ) as stream:
+            yield from stream.text_stream
+
+    @staticmethod
+    def _collect(chunks: Iterator[str], max_chars: float) -> str | None:
+        """Accumulate streamed chunks; abort and return None past max_chars."""
+        parts = []
+        total = 0
+        for chunk in chunks:
+            parts.append(chunk)
+            total += len(chunk)
+            if total > max_chars:
+                chunks.close()
+                return None
+        return "".join(parts).strip()
+
+    def _local_refine(self, transcript: str, screen_context: str) -> str | None:
+        """Local cleanup result when the shortcut is enabled and applies, else None."""
+        if not self.local_shortcut:
+            return None
+        return _local_refine(transcript, screen_context)
+
+    def refine_stream(self, transcript: str, screen_context: str = "") -> Iterator[str]:
+        """Stream refined text as it is generated (no length guard applied)."""
+        if not transcript.strip():
+            return
+
+        local = self._local_refine(transcript, screen_context)
+        if local is not None:
+            yield local
+            return
+
+        user_msg = _user_message(_TRANSCRIPT_PREFIX, transcript, screen_context)
+        max_tok = self._output_budget(transcript, 1.2, 1.5, 200, 1000)
+        yield from self._stream_openai(_REFINE_SYSTEM, user_msg, 0.1, max_tok)
+
     def refine(self, transcript: str, screen_context: str = "") -> str:
-        """Refine a transcript segment using LLM."""
+        """Refine a transcript segment using LLM (cached for repeated segments).
+
+        With ``refiner_local_shortcut`` enabled, plain Korean that only needs
+        deterministic cleanup never reaches the API.
+        """
         if not transcript.strip():
             return transcript
 
-        user_msg = f"Transcript:\n{transcript}"
-        if screen_context:
-            user_msg = f"Slide context:\n{screen_context}\n\n{user_msg}"
+        local = self._local_refine(transcript, screen_context)
+        if local is not None:
+            return local
 
-        try:
-            input_len = len(transcript)
-            max_tok = min(1000, max(200, int(input_len * 1.5)))
+        cached = self._cache_get("refine", transcript, screen_context)
+        if cached is not None:
+            return cached
 
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": REFINE_PROMPT},
-                    {"role": "user", "content": user_msg},
-                ],
-                temperature=0.1,
-                max_tokens=max_tok,
+        try:
+            result = self._collect(
+                self.refine_stream(transcript, screen_context), len(transcript) * 2,
             )
-            result = response.choices[0].message.content.strip()
-            if not result:
-                return transcript
-
-            if len(result) > len(transcript) * 2:
+            if result is None:
                 logger.warning(
-                    "Refiner hallucination detected: input=%d chars, output=%d chars. Using original.",
-                    len(transcript), len(result),
+                    "Refiner hallucination detected: input=%d chars, output exceeded %d. Using original.",
+                    len(transcript), len(transcript) * 2,
                 )
                 return transcript
+            if not result:
+                return transcript
 
+            self._cache_put("refine", transcript, screen_context, result)
             return result
         except Exception as e:
             logger.warning("Transcript refinement failed: %s", e)
             return transcript
 
+    def refine_batch(self, items: list[tuple[str, str]]) -> list[str] | None:
+        """Refine several (transcript, screen_context) pairs in one API call.
+
+        Returns None if the response doesn't split back into one section per
+        item; callers should then fall back to refine() per item.
+        """
+        results = [self._local_refine(transcript, context) for transcript, context in items]
+        remote = [i for i, result in enumerate(results) if result is None]
+        if not remote:
+            return results
+
+        sections = []
+        for n, i in enumerate(remote, 1):
+            transcript, screen_context = items[i]
+            section = _user_message(_TRANSCRIPT_PREFIX, transcript, screen_context)["content"]
+            sections.append(f"### BATCH {n}\n{section}")
+        user_msg = "\n\n".join(sections)
+
+        max_tok = min(4000, sum(
+            self._output_budget(items[i][0], 1.2, 1.5, 200, 1000) + 16
+            for i in remote
+        ))
+
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[_BATCH_REFINE_SYSTEM, {"role": "user", "content": user_msg}],
+            temperature=0.1,
+            max_tokens=max_tok,
+        )
+        content = response.choices[0].message.content or ""
+
+        parts = _BATCH_HEADER.split(content)[1:]
+        numbers = [int(n) for n in parts[0::2]]
+        if numbers != list(range(1, len(remote) + 1)):
+            logger.warning(
+                "Batched refine returned %d sections for %d batches, falling back",
+                len(numbers), len(remote),
+            )
+            return None
+
+        for i, text in zip(remote, parts[1::2]):
+            transcript, screen_context = items[i]
+            text = text.strip()
+            if not text or len(text) > len(transcript) * 2:
+                results[i] = transcript
+                continue
+            self._cache_put("refine", transcript, screen_context, text)
+            results[i] = text
+        return results
+
+    def finalize_stream(self, transcript: str, screen_context: str = "") -> Iterator[str]:
+        """Stream the final proofreading pass as it is generated."""
+        if not transcript.strip():
+            return
+
+        user_msg = _user_message(_TEXT_PREFIX, transcript, screen_context)
+        max_tok = self._output_budget(transcript, 1.15, 1.3, 200, 2000)
+        yield from self._stream_openai(_FINALIZE_SYSTEM, user_msg, 0.15, max_tok)
+
     def finalize(self, transcript: str, screen_context: str = "") -> str:
         """Final light proofreading pass over a full slide's refined text."""
         if not transcript.strip():
             return transcript
 
-        user_msg = f"Text:\n{transcript}"
-        if screen_context:
-            user_msg = f"Slide context:\n{screen_context}\n\n{user_msg}"
-
         try:
-            input_len = len(transcript)
-            max_tok = min(2000, max(200, int(input_len * 1.3)))
-
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": FINALIZE_PROMPT},
-                    {"role": "user", "content": user_msg},
-                ],
-                temperature=0.15,
-                max_tokens=max_tok,
+            result = self._collect(
+                self.finalize_stream(transcript, screen_context), len(transcript) * 1.5,
             )
-            result = response.choices[0].message.content.strip()
-            if not result:
-                return transcript
-
-            if len(result) > len(transcript) * 1.5:
+            if result is None:
                 logger.warning(
-                    "Finalize output too long: input=%d, output=%d. Using original.",
-                    len(transcript), len(result),
+                    "Finalize output too long: input=%d, output exceeded %d. Using original.",
+                    len(transcript), int(len(transcript) * 1.5),
                 )
                 return transcript
+            if not result:
+                return transcript
 
             return result
         except Exception as e:
             logger.warning("Finalize failed: %s", e)
             return transcript
 
+    @staticmethod
+    def _polish_user_message(transcript: str, screen_context: str) -> dict:
+        if screen_context:
+            content = "".join((
+                _POLISH_CONTEXT_PREFIX, screen_context, _POLISH_TRANSCRIPT_PREFIX, transcript,
+            ))
+        else:
+            content = transcript
+        return {"role": "user", "content": content}
+
+    @staticmethod
+    def _polish_max_tokens(transcript: str) -> int:
+        return min(8192, max(500, int(len(transcript) * 2)))
+
+    def polish_stream(self, transcript: str, screen_context: str = "") -> Iterator[str]:
+        """Stream polished notes (Claude if configured) as they are generated."""
+        if not transcript.strip():
+            return
+
+        user_msg = self._polish_user_message(transcript, screen_context)
+        max_tok = self._polish_max_tokens(transcript)
+        if self.anthropic:
+            yield from self._stream_anthropic(_POLISH_SYSTEM_ANTHROPIC, user_msg, 0.3, max_tok)
+        else:
+            yield from self._stream_openai(_POLISH_SYSTEM, user_msg, 0.3, max_tok)
+
     def polish(self, transcript: str, screen_context: str = "") -> str:
         """Polish refined transcript using Claude for medical-grade notes."""
         if not transcript.strip():
             return transcript
 
-        user_msg = transcript
-        if screen_context:
-            user_msg = f"[슬라이드 context]\n{screen_context}\n\n[강의 transcript]\n{user_msg}"
-
         try:
-            input_len = len(transcript)
-            max_tok = min(8192, max(500, int(input_len * 2)))
-
-            if self.anthropic:
-                response = self.anthropic.messages.create(
-                    model=self.anthropic_model,
-                    system=POLISH_PROMPT,
-                    messages=[{"role": "user", "content": user_msg}],
-                    temperature=0.3,
-                    max_tokens=max_tok,
-                )
-                result = response.content[0].text.strip()
-            else:
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": POLISH_PROMPT},
-                        {"role": "user", "content": user_msg},
-                    ],
-                    temperature=0.3,
-                    max_tokens=max_tok,
-                )
-                result = response.choices[0].message.content.strip()
-
-            if not result:
-                return transcript
-
-            if len(result) > len(transcript) * 2.5:
+            result = self._collect(
+                self.polish_stream(transcript, screen_context), len(transcript) * 2.5,
+            )
+            if result is None:
                 logger.warning(
-                    "Polish output too long: input=%d, output=%d. Using original.",
-                    len(transcript), len(result),
+                    "Polish output too long: input=%d, output exceeded %d. Using original.",
+                    len(transcript), int(len(transcript) * 2.5),
                 )
                 return transcript
+            if not result:
+                return transcript
 
             return result
         except Exception as e:
             logger.warning("Polish failed: %s", e)
             return transcript
 
+    def polish_batch(self, items: list[tuple[str, str]], realtime: bool = False,
+                     timeout_sec: float = 600.0) -> list[str]:
+        """Polish many (transcript, screen_context) pairs in one provider batch job.
+
+        Uses Anthropic Message Batches if configured, else the OpenAI Batch
+        API; both bill at half the synchronous rate. Items the batch doesn't
+        return (failure, timeout, length guard) fall back to polish(). With
+        ``realtime=True`` every item goes through polish() directly.
+        """
+        results: list[str | None] = [None] * len(items)
+        pending = []
+        for i, (transcript, _) in enumerate(items):
+            if transcript.strip():
+                pending.append(i)
+            else:
+                results[i] = transcript
+
+        if pending and not realtime:
+            try:
+                if self.anthropic:
+                    outputs = self._run_anthropic_batch(items, pending, timeout_sec)
+                else:
+                    outputs = self._run_openai_batch(items, pending, timeout_sec)
+            except Exception as e:
+                logger.warning("Polish batch failed, falling back to per-slide calls: %s", e)
+                outputs = {}
+
+            for i, text in outputs.items():
+                transcript = items[i][0]
+                if text and len(text) <= len(transcript) * 2.5:
+                    results[i] = text
+
+        for i, (transcript, screen_context) in enumerate(items):
+            if results[i] is None:
+                results[i] = self.polish(transcript, screen_context)
+        return results
+
+    def _run_openai_batch(self, items: list[tuple[str, str]], pending: list[int],
+                          timeout_sec: float) -> dict[int, str]:
+        lines = []
+        for i in pending:
+            transcript, screen_context = items[i]
+            lines.append(json.dumps({
+                "custom_id": str(i),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": self.model,
+                    "messages": [_POLISH_SYSTEM, self._polish_user_message(transcript, screen_context)],
+                    "temperature": 0.3,
+                    "max_tokens": self._polish_max_tokens(transcript),
+                },
+            }, ensure_ascii=False))
+
+        input_file = self.client.files.create(
+            file=("polish_batch.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch",
+        )
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        logger.info("Submitted OpenAI polish batch %s (%d slides)", batch.id, len(pending))
+
+        deadline = time.monotonic() + timeout_sec
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            if time.monotonic() >= deadline:
+                self.client.batches.cancel(batch.id)
+                raise TimeoutError(f"batch {batch.id} still {batch.status}")
+            time.sleep(BATCH_POLL_INTERVAL_SEC)
+            batch = self.client.batches.retrieve(batch.id)
+
+        if batch.status != "completed" or not batch.output_file_id:
+            raise RuntimeError(f"batch {batch.id} ended with status {batch.status}")
+
+        outputs = {}
+        for line in self.client.files.content(batch.output_file_id).text.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if response.get("status_code") != 200:
+                continue
+            content = response["body"]["choices"][0]["message"]["content"] or ""
+            outputs[int(record["custom_id"])] = content.strip()
+        return outputs
+
+    def _run_anthropic_batch(self, items: list[tuple[str, str]], pending: list[int],
+                             timeout_sec: float) -> dict[int, str]:
+        requests = []
+        for i in pending:
+            transcript, screen_context = items[i]
+            requests.append({
+                "custom_id": str(i),
+                "params": {
+                    "model": self.anthropic_model,
+                    "system": _POLISH_SYSTEM_ANTHROPIC,
+                    "messages": [self._polish_user_message(transcript, screen_context)],
+                    "temperature": 0.3,
+                    "max_tokens": self._polish_max_tokens(transcript),
+                },
+            })
+
+        batch = self.anthropic.messages.batches.create(requests=requests)
+        logger.info("Submitted Anthropic polish batch %s (%d slides)", batch.id, len(pending))
+
+        deadline = time.monotonic() + timeout_sec
+        while batch.processing_status != "ended":
+            if time.monotonic() >= deadline:
+                self.anthropic.messages.batches.cancel(batch.id)
+                raise TimeoutError(f"batch {batch.id} still {batch.processing_status}")
+            time.sleep(BATCH_POLL_INTERVAL_SEC)
+            batch = self.anthropic.messages.batches.retrieve(batch.id)
+
+        outputs = {}
+        for entry in self.anthropic.messages.batches.results(batch.id):
+            if entry.result.type != "succeeded":
+                continue
+            text = "".join(
+                block.text for block in entry.result.message.content if block.type == "text"
+            )
+            outputs[int(entry.custom_id)] = text.strip()
+        return outputs
+
     def summarize(self, transcript: str, screen_context: str = "") -> list[str]:
-        """Generate bullet-point summary from refined transcript."""
-        if not transcript.strip():
-            return []
+        """Generate bullet-point summary from refined transcript (cached)."""
+        local = _local_summary(transcript)
+        if local is not None:
+            return local
 
-        user_msg = f"Transcript:\n{transcript}"
-        if screen_context:
-            user_msg = f"Slide context:\n{screen_context}\n\n{user_msg}"
+        cached = self._cache_get("summarize", transcript, screen_context)
+        if cached is not None:
+            return list(cached)
+
+        user_msg = _user_message(_TRANSCRIPT_PREFIX, transcript, screen_context)
 
         try:
             response = self.client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": SUMMARY_PROMPT},
-                    {"role": "user", "content": user_msg},
-                ],
+                messages=[_SUMMARY_SYSTEM, user_msg],
                 temperature=0.2,
                 max_tokens=500,
             )
-            result = response.choices[0].message.content.strip()
-            if not result:
-                return []
+            bullets = _parse_bullets(response.choices[0].message.content)
+            if bullets:
+                self._cache_put("summarize", transcript, screen_context, tuple(bullets))
+            return bullets
+        except Exception as e:
+            logger.warning("Summarize failed: %s", e)
+            return []
+
+    def _run_async(self, coro, timeout: float):
+        """Run a coroutine on the refiner's own event loop and wait for it.
+
+        One long-lived loop keeps the async clients' connection pools valid
+        across exports (they are bound to the loop that first used them).
+        If it has not finished after ``timeout`` seconds the coroutine is
+        cancelled and TimeoutError is raised, so a wedged loop cannot hang
+        the caller.
+        """
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    @staticmethod
+    async def _retry_rate_limited(make_call):
+        """Await make_call(), retrying rate-limit errors with jittered backoff."""
+        for attempt in range(RATE_LIMIT_MAX_RETRIES):
+            try:
+                return await make_call()
+            except RATE_LIMIT_ERRORS as e:
+                if attempt == RATE_LIMIT_MAX_RETRIES - 1:
+                    raise
+                delay = _rate_limit_delay(attempt)
+                logger.info("Rate limited (%s), retrying in %.1fs", e, delay)
+                await asyncio.sleep(delay)
+
+    async def _astream_openai(self, system_msg: dict, user_msg: dict, temperature: float,
+                              max_tokens: int) -> AsyncIterator[str]:
+        stream = await self._retry_rate_limited(
+            lambda: self.async_client.chat.completions.create(
+                model=self.model,
+                messages=[system_msg, user_msg],
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                timeout=STREAM_TIMEOUT,
+            )
+        )
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.close()
+
+    async def _astream_anthropic(self, system: list[dict], user_msg: dict, temperature: float,
+                                 max_tokens: int) -> AsyncIterator[str]:
+        # Rate limits surface when the stream is opened; only retry before any text.
+        for attempt in range(RATE_LIMIT_MAX_RETRIES):
+            started = False
+            try:
+                async with self.async_anthropic.messages.stream(
+                    model=self.anthropic_model,
+                    system=system,
+                    messages=[user_msg],
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    timeout=STREAM_TIMEOUT,
+                ) as stream:
+                    async for text in stream.text_stream:
+                        started = True
+                        yield text
+                return
+            except RATE_LIMIT_ERRORS as e:
+                if started or attempt == RATE_LIMIT_MAX_RETRIES - 1:
+                    raise
+                delay = _rate_limit_delay(attempt)
+                logger.info("Rate limited (%s), retrying in %.1fs", e, delay)
+                await asyncio.sleep(delay)
+
+    async def polish_async(self, transcript: str, screen_context: str = "") -> str:
+        """Async polish(); same length guard and fallback to the input."""
+        if not transcript.strip():
+            return transcript
+
+        user_msg = self._polish_user_message(transcript, screen_context)
+        max_tok = self._polish_max_tokens(transcript)
+        if self.async_anthropic:
+            chunks = self._astream_anthropic(_POLISH_SYSTEM_ANTHROPIC, user_msg, 0.3, max_tok)
+        else:
+            chunks = self._astream_openai(_POLISH_SYSTEM, user_msg, 0.3, max_tok)
+
+        max_chars = len(transcript) * 2.5
+        parts = []
+        total = 0
+        try:
+            async for chunk in chunks:
+                parts.append(chunk)
+                total += len(chunk)
+                if total > max_chars:
+                    logger.warning(
+                        "Polish output too long: input=%d, output exceeded %d. Using original.",
+                        len(transcript), int(max_chars),
+                    )
+                    return transcript
+        except Exception as e:
+            logger.warning("Polish failed: %s", e)
+            return transcript
+        finally:
+            await chunks.aclose()
+        return "".join(parts).strip() or transcript
 
-            bullets = [line.strip().lstrip("•-·* ") for line in result.split("\n")]
-            bullets = [b for b in bullets if b]
+    async def summarize_async(self, transcript: str, screen_context: str = "") -> list[str]:
+        """Async summarize(), sharing its response cache."""
+        local = _local_summary(transcript)
+        if local is not None:
+            return local
+
+        cached = self._cache_get("summarize", transcript, screen_context)
+        if cached is not None:
+            return list(cached)
+
+        user_msg = _user_message(_TRANSCRIPT_PREFIX, transcript, screen_context)
+
+        try:
+            response = await self._retry_rate_limited(
+                lambda: self.async_client.chat.completions.create(
+                    model=self.model,
+                    messages=[_SUMMARY_SYSTEM, user_msg],
+                    temperature=0.2,
+                    max_tokens=500,
+                )
+            )
+            bullets = _parse_bullets(response.choices[0].message.content)
+            if bullets:
+                self._cache_put("summarize", transcript, screen_context, tuple(bullets))
             return bullets
         except Exception as e:
             logger.warning("Summarize failed: %s", e)
             return []
 
+    def polish_and_summarize_all(
+        self, slides: list[tuple[int, str, str]],
+    ) -> list[tuple[str, list[str]]]:
+        """Polish then summarize every (slide_idx, transcript, context), slides concurrently.
+
+        Each slide's summary is built from its polished text, so the two
+        calls stay ordered per slide; slides run in parallel, at most
+        ``max_concurrency`` at a time. Results are in input order.
+
+        Raises TimeoutError if the whole run takes longer than two requests
+        (polish, summary) at HTTP_TIMEOUT_SEC per wave of slides.
+        """
+        async def run_all():
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+
+            async def one(transcript: str, context: str) -> tuple[str, list[str]]:
+                async with semaphore:
+                    polished = await self.polish_async(transcript, context)
+                    return polished, await self.summarize_async(polished, context)
+
+            return await asyncio.gather(*(one(text, ctx) for _, text, ctx in slides))
+
+        if not slides:
+            return []
+        waves = -(-len(slides) // self.max_concurrency)
+        return self._run_async(run_all(), timeout=2 * HTTP_TIMEOUT_SEC * waves)
+
 
 class RefinerBuffer:
-    """Buffers transcript segments and flushes them to the refiner in batches."""
+    """Buffers transcript segments and flushes them to the refiner in batches.
+
+    A batch is flushed once its first segment has waited ``flush_interval_sec``
+    (or earlier, on a slide change or an explicit flush()), so no segment sits
+    in the buffer longer than the interval however many arrive.
+
+    Flushes are handed to a single worker thread. Flushes that pile up while a
+    request is in flight (typical at slide transitions) are coalesced into one
+    refine_batch() call of up to ``max_batches_per_call`` slides.
+    """
 
     def __init__(self, refiner: TranscriptRefiner, on_refined: callable,
-                 get_context: callable, max_segments: int = 2,
-                 flush_timeout_sec: float = 4.0):
+                 get_context: callable, flush_interval_sec: float = 4.0,
+                 max_batches_per_call: int = 4):
         self.refiner = refiner
         self.on_refined = on_refined
         self.get_context = get_context
-        self.max_segments = max_segments
-        self.flush_timeout_sec = flush_timeout_sec
+        self.flush_interval_sec = flush_interval_sec
+        self.max_batches_per_call = max_batches_per_call
 
         self._buffer: list[tuple[str, int]] = []
         self._lock = threading.Lock()
-        self._first_buffered_at = 0.0
-        self._timer: threading.Timer | None = None
+        self._deadline: float | None = None
+        self._deadline_cv = threading.Condition(self._lock)
         self._pending_count = 0
         self._pending_lock = threading.Lock()
         self._all_done = threading.Event()
         self._all_done.set()
+        self._pending_batches: list[list[tuple[str, int]]] = []
+        self._batch_cv = threading.Condition()
+        # slide -> (hash of the last text refined for it, its refined text);
+        # worker thread only
+        self._last_by_slide: dict[int, tuple[int, str]] = {}
+        threading.Thread(target=self._batch_worker, daemon=True).start()
+        threading.Thread(target=self._scheduler_loop, daemon=True).start()
 
     def add(self, text: str, slide_idx: int):
         """Add a transcript segment to the buffer."""
@@ -383,21 +1068,21 @@ class RefinerBuffer:
                 self._flush_locked()
 
             self._buffer.append((text, slide_idx))
-            if len(self._buffer) == 1:
-                self._first_buffered_at = time.monotonic()
-                self._timer = threading.Timer(
-                    self.flush_timeout_sec, self._flush_on_timeout,
-                )
-                self._timer.daemon = True
-                self._timer.start()
-
-            if len(self._buffer) >= self.max_segments:
-                self._flush_locked()
-
-    def _flush_on_timeout(self):
-        """Called by timer thread when flush timeout expires."""
-        with self._lock:
-            if self._buffer:
+            if self._deadline is None:
+                self._deadline = time.monotonic() + self.flush_interval_sec
+                self._deadline_cv.notify()
+
+    def _scheduler_loop(self):
+        """Flush the buffer once its deadline passes (one thread for all batches)."""
+        with self._deadline_cv:
+            while True:
+                if self._deadline is None:
+                    self._deadline_cv.wait()
+                    continue
+                remaining = self._deadline - time.monotonic()
+                if remaining > 0:
+                    self._deadline_cv.wait(remaining)
+                    continue
                 self._flush_locked()
 
     def _flush_locked(self):
@@ -407,18 +1092,82 @@ class RefinerBuffer:
 
         segments = list(self._buffer)
         self._buffer.clear()
-        self._first_buffered_at = 0.0
-        if self._timer:
-            self._timer.cancel()
-            self._timer = None
+        self._deadline = None
 
         with self._pending_lock:
             self._pending_count += 1
             self._all_done.clear()
 
-        threading.Thread(
-            target=self._do_flush, args=(segments,), daemon=True,
-        ).start()
+        with self._batch_cv:
+            self._pending_batches.append(segments)
+            self._batch_cv.notify()
+
+    def _batch_worker(self):
+        """Drain queued flushes, coalescing any that arrived together."""
+        while True:
+            with self._batch_cv:
+                while not self._pending_batches:
+                    self._batch_cv.wait()
+                batches = self._pending_batches[:self.max_batches_per_call]
+                del self._pending_batches[:len(batches)]
+
+            try:
+                previous = [self._previous_result(segments) for segments in batches]
+                if all(p is None for p in previous):
+                    if len(batches) == 1:
+                        self._do_flush(batches[0])
+                    else:
+                        self._do_flush_many(batches)
+                else:
+                    # Deliver in order; a repeat re-sends its earlier refinement.
+                    for segments, text in zip(batches, previous):
+                        if text is None:
+                            self._do_flush(segments)
+                        else:
+                            self.on_refined(text, segments[-1][1])
+            finally:
+                with self._pending_lock:
+                    self._pending_count -= len(batches)
+                    if self._pending_count == 0:
+                        self._all_done.set()
+
+    def _previous_result(self, segments: list[tuple[str, int]]) -> str | None:
+        """The earlier refinement if this exact text was just refined for the slide.
+
+        Only final results reach the buffer, so a repeat is the lecturer
+        really saying it again: it is re-delivered, just not re-refined.
+        """
+        slide_idx = segments[-1][1]
+        combined = " ".join(text for text, _ in segments)
+        last = self._last_by_slide.get(slide_idx)
+        if last is not None and last[0] == hash(combined):
+            logger.debug("Reusing refinement of repeated text for slide %d", slide_idx)
+            return last[1]
+        return None
+
+    def _do_flush_many(self, batches: list[list[tuple[str, int]]]):
+        """Refine several slides' batches in one call; per-batch on mismatch."""
+        items = []
+        refined = None
+        try:
+            for segments in batches:
+                slide_idx = segments[-1][1]
+                combined = " ".join(text for text, _ in segments)
+                items.append((combined, self.get_context(slide_idx, combined), slide_idx))
+            refined = self.refiner.refine_batch(
+                [(combined, context) for combined, context, _ in items]
+            )
+        except Exception as e:
+            logger.warning("Coalesced refine failed: %s", e)
+
+        if not isinstance(refined, list) or len(refined) != len(batches):
+            for segments in batches:
+                self._do_flush(segments)
+            return
+
+        for (combined, _, slide_idx), text in zip(items, refined):
+            self.on_refined(text, slide_idx)
+            self._last_by_slide[slide_idx] = (hash(combined), text)
 
     def _do_flush(self, segments: list[tuple[str, int]]):
         """Refine a batch of segments and deliver result."""
@@ -429,14 +1178,10 @@ class RefinerBuffer:
             context = self.get_context(slide_idx, combined)
             refined = self.refiner.refine(combined, context)
             self.on_refined(refined, slide_idx)
+            self._last_by_slide[slide_idx] = (hash(combined), refined)
         except Exception as e:
             logger.warning("Batch refine failed: %s", e)
             self.on_refined(combined, slide_idx)
-        finally:
-            with self._pending_lock:
-                self._pending_count -= 1
-                if self._pending_count == 0:
-                    self._all_done.set()
 
     def flush(self):
         """Force flush any remaining buffer (e.g., on stop)."""
@@ -1,16 +1,105 @@
+import asyncio
+import functools
+import hashlib
 import threading
 import queue
 import time
 import logging
+import os
+import tempfile
+from pathlib import Path
 
-from google.cloud.speech_v2 import SpeechClient
+import numpy as np
+from google.cloud.speech_v2 import SpeechAsyncClient
 from google.cloud.speech_v2.types import cloud_speech
 from google.api_core.client_options import ClientOptions
 
-from medical.terms import get_all_medical_terms, MIXED_LECTURE_TERMS
+from medical.terms import get_dynamic_terms, get_static_medical_terms, MIXED_LECTURE_TERMS
 
 logger = logging.getLogger(__name__)
 
+PHRASE_SET_CHUNK = 500
+PHRASE_SET_CACHE_DIR = Path.home() / ".cache" / "lecturenotetaker"
+
+
+@functools.lru_cache(maxsize=1)
+def _static_phrase_terms() -> tuple[tuple[str, int], ...]:
+    """Static medical + mixed lecture terms; these never change at runtime."""
+    return get_static_medical_terms() + tuple(MIXED_LECTURE_TERMS)
+
+
+def _chunked_phrase_sets(terms) -> list[cloud_speech.SpeechAdaptation.AdaptationPhraseSet]:
+    if not terms:
+        return []
+    values, boosts = zip(*terms)
+    # Boosts are stored as float32 in the proto; scale them in one vector op.
+    scaled = (np.asarray(boosts, dtype=np.float32) / np.float32(10.0)).tolist()
+    phrases = [
+        cloud_speech.PhraseSet.Phrase(value=value, boost=boost)
+        for value, boost in zip(values, scaled)
+    ]
+    return [
+        cloud_speech.SpeechAdaptation.AdaptationPhraseSet(
+            inline_phrase_set=cloud_speech.PhraseSet(phrases=phrases[i:i + PHRASE_SET_CHUNK])
+        )
+        for i in range(0, len(phrases), PHRASE_SET_CHUNK)
+    ]
+
+
+def _phrase_set_cache_path(terms) -> Path:
+    digest = hashlib.sha256(repr(terms).encode("utf-8")).hexdigest()[:16]
+    return PHRASE_SET_CACHE_DIR / f"phrase_set_{digest}.pb"
+
+
+def _read_cached_adaptation(path: Path, expected_phrases: int) -> bytes | None:
+    """Return the cached blob, or None if it is missing or does not parse back
+    to the expected number of phrases. Corrupt files are deleted."""
+    try:
+        blob = path.read_bytes()
+    except OSError:
+        return None
+    try:
+        adaptation = cloud_speech.SpeechAdaptation.deserialize(blob)
+        phrases = sum(len(ps.inline_phrase_set.phrases) for ps in adaptation.phrase_sets)
+        if phrases != expected_phrases:
+            raise ValueError(f"{phrases} phrases, expected {expected_phrases}")
+    except Exception as e:
+        logger.warning("Discarding corrupt phrase set cache %s: %s", path, e)
+        path.unlink(missing_ok=True)
+        return None
+    return blob
+
+
+@functools.lru_cache(maxsize=1)
+def _static_adaptation_blob() -> bytes:
+    """Serialized SpeechAdaptation for the static terms.
+
+    Cached on disk under a hash of the term list, so later runs hydrate it with
+    a single protobuf parse instead of building thousands of Phrase messages.
+    The file is written atomically and rebuilt if it does not parse.
+    """
+    terms = _static_phrase_terms()
+    path = _phrase_set_cache_path(terms)
+    blob = _read_cached_adaptation(path, len(terms))
+    if blob is not None:
+        return blob
+
+    blob = cloud_speech.SpeechAdaptation.serialize(
+        cloud_speech.SpeechAdaptation(phrase_sets=_chunked_phrase_sets(terms))
+    )
+    tmp = None
+    try:
+        PHRASE_SET_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=PHRASE_SET_CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(blob)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.debug("Could not write phrase set cache %s: %s", path, e)
+        if tmp is not None:
+            Path(tmp).unlink(missing_ok=True)
+    return blob
+
 
 class StreamingSTT:
     """Manages streaming recognition sessions with Chirp 3 and medical term boosting."""
@@ -25,31 +114,41 @@ class StreamingSTT:
         self._running = False
         self._force_restart = False
         self._thread = None
-        self._client = SpeechClient(
-            client_options=ClientOptions(
-                api_endpoint=f"{config.gcp_region}-speech.googleapis.com"
-            )
+        self._adaptation_cache: cloud_speech.SpeechAdaptation | None = None
+        self._adaptation_dirty = True
+        self._sink: asyncio.Queue | None = None
+        self._sink_ready: asyncio.Event | None = None
+        # Audio a failed session never sent; replayed into the next session.
+        self._replay: list[bytes] = []
+        # Handed-over sessions still delivering their last results. Kept here
+        # so the tasks are not garbage-collected before they finish.
+        self._retired: set[asyncio.Task] = set()
+        # The async client binds to the event loop, so it is created on the STT thread.
+        self._client_options = ClientOptions(
+            api_endpoint=f"{config.gcp_region}-speech.googleapis.com"
         )
 
     def _build_phrase_set(self) -> cloud_speech.SpeechAdaptation:
-        """Build phrase set from medical terminology (static + dynamic) for recognition boosting."""
-        all_terms = get_all_medical_terms() + MIXED_LECTURE_TERMS
-        phrases = [
-            cloud_speech.PhraseSet.Phrase(value=term, boost=boost / 10.0)
-            for term, boost in all_terms
-        ]
-
-        phrase_sets = []
-        for i in range(0, len(phrases), 500):
-            chunk = phrases[i:i + 500]
-            phrase_sets.append(
-                cloud_speech.SpeechAdaptation.AdaptationPhraseSet(
-                    inline_phrase_set=cloud_speech.PhraseSet(phrases=chunk)
-                )
-            )
+        """Build phrase set from medical terminology (static + dynamic) for recognition boosting.
+
+        The result is cached across reconnects and only rebuilt after
+        force_restart(terms_changed=True).
+        """
+        if not self._adaptation_dirty and self._adaptation_cache:
+            return self._adaptation_cache
+
+        adaptation = cloud_speech.SpeechAdaptation.deserialize(_static_adaptation_blob())
+        dynamic_terms = get_dynamic_terms()
+        if dynamic_terms:
+            adaptation.phrase_sets.extend(_chunked_phrase_sets(dynamic_terms))
 
-        logger.info("Built phrase set with %d terms (%d chunks)", len(phrases), len(phrase_sets))
-        return cloud_speech.SpeechAdaptation(phrase_sets=phrase_sets)
+        logger.info(
+            "Built phrase set with %d terms (%d chunks)",
+            len(_static_phrase_terms()) + len(dynamic_terms), len(adaptation.phrase_sets),
+        )
+        self._adaptation_cache = adaptation
+        self._adaptation_dirty = False
+        return self._adaptation_cache
 
     def _make_config_request(self) -> cloud_speech.StreamingRecognizeRequest:
         recognition_config = cloud_speech.RecognitionConfig(
@@ -76,66 +175,134 @@ class StreamingSTT:
             streaming_config=streaming_config,
         )
 
-    def _audio_generator(self):
-        """Yield audio chunks from the queue, respecting 25KB limit."""
+    async def _request_stream(self, audio: asyncio.Queue):
+        """Yield the config request, then audio requests until a None sentinel.
+
+        Audio is split to respect the 25KB per-request limit.
+        """
         MAX_CHUNK_BYTES = 25000
-        while self._running and not self._force_restart:
-            try:
-                chunk = self.audio_queue.get(timeout=0.1)
-                for i in range(0, len(chunk), MAX_CHUNK_BYTES):
-                    yield cloud_speech.StreamingRecognizeRequest(
-                        audio=chunk[i:i + MAX_CHUNK_BYTES]
+        yield self._make_config_request()
+        while True:
+            chunk = await audio.get()
+            if chunk is None:
+                return
+            for i in range(0, len(chunk), MAX_CHUNK_BYTES):
+                yield cloud_speech.StreamingRecognizeRequest(
+                    audio=chunk[i:i + MAX_CHUNK_BYTES]
+                )
+
+    async def _consume_session(self, client: SpeechAsyncClient, audio: asyncio.Queue):
+        """Run one streaming session and deliver its results."""
+        responses = await client.streaming_recognize(
+            requests=self._request_stream(audio)
+        )
+        async for response in responses:
+            if not self._running:
+                return
+            for result in response.results:
+                if result.alternatives:
+                    self.on_transcript(
+                        result.alternatives[0].transcript, result.is_final,
+                        words=None, confidence=1.0,
                     )
-            except queue.Empty:
+
+    def _read_audio(self):
+        try:
+            return self.audio_queue.get(timeout=0.2)
+        except queue.Empty:
+            return None
+
+    async def _pump_audio(self):
+        """Move audio from the capture queue into the active session's queue.
+
+        Reads block in a worker thread, so the loop only wakes when audio
+        arrives. While no session is active (backoff after an error) the pump
+        waits on _sink_ready and audio stays in the capture queue.
+        """
+        while self._running:
+            await self._sink_ready.wait()
+            chunk = await asyncio.to_thread(self._read_audio)
+            if chunk is None:
                 continue
+            sink = self._sink
+            if sink is None:
+                # The session ended while we were reading.
+                self._replay.append(chunk)
+            else:
+                sink.put_nowait(chunk)
 
-    def _request_generator(self):
-        """Yield config request first, then audio requests."""
-        yield self._make_config_request()
-        yield from self._audio_generator()
+    def _set_sink(self, audio: asyncio.Queue | None):
+        self._sink = audio
+        if audio is None:
+            self._sink_ready.clear()
+        else:
+            self._sink_ready.set()
+
+    @staticmethod
+    def _drain(audio: asyncio.Queue) -> list[bytes]:
+        leftover = []
+        while not audio.empty():
+            chunk = audio.get_nowait()
+            if chunk is not None:
+                leftover.append(chunk)
+        return leftover
 
-    def _run_stream(self):
-        """Run streaming sessions with auto-restart.
+    def _open_session(self, client: SpeechAsyncClient) -> tuple[asyncio.Task, asyncio.Queue]:
+        logger.info("Starting new STT streaming session")
+        audio: asyncio.Queue = asyncio.Queue()
+        if self._replay:
+            logger.info("Replaying %d audio chunks from the failed session", len(self._replay))
+            for chunk in self._replay:
+                audio.put_nowait(chunk)
+            self._replay.clear()
+        task = asyncio.create_task(self._consume_session(client, audio))
+        return task, audio
 
-        Audio is preserved across restarts because the queue persists — chunks
-        that arrive during the brief reconnect gap are picked up by the next
-        session.  We keep the timeout close to Google's 5-min limit to
-        minimise the number of restarts (and therefore gaps).
+    @staticmethod
+    def _log_retired_session(task: asyncio.Task):
+        if not task.cancelled() and task.exception():
+            logger.warning("Retired STT session ended with error: %s", task.exception())
+
+    async def _run_stream(self):
+        """Run streaming sessions with hot-swap reconnects.
+
+        Google limits a stream to 5 minutes. About a second before the limit
+        (or on force_restart) the next session is opened and audio is switched
+        over to it before the old one is closed. The old session keeps
+        delivering its last results while the new one is already receiving
+        audio, so the reconnect leaves no gap.
         """
+        client = SpeechAsyncClient(client_options=self._client_options)
+        self._sink_ready = asyncio.Event()
+        pump = asyncio.create_task(self._pump_audio())
+        handover_after = max(1.0, self.config.stt_stream_timeout_sec - 1.0)
         consecutive_errors = 0
-        while self._running:
-            self._force_restart = False
-            stream_start = time.monotonic()
-            try:
-                logger.info("Starting new STT streaming session")
-                responses = self._client.streaming_recognize(
-                    requests=self._request_generator()
-                )
-                for response in responses:
-                    if not self._running:
-                        return
-                    if self._force_restart:
-                        break
-                    elapsed = time.monotonic() - stream_start
-                    if elapsed > self.config.stt_stream_timeout_sec:
-                        logger.info(
-                            "Stream timeout reached (%.0fs), restarting...",
-                            elapsed,
-                        )
-                        break
-                    for result in response.results:
-                        if result.alternatives:
-                            transcript = result.alternatives[0].transcript
-                            is_final = result.is_final
-                            self.on_transcript(
-                                transcript, is_final,
-                                words=None, confidence=1.0,
-                            )
-                consecutive_errors = 0
-            except Exception as e:
-                if self._running:
+        current = None
+        try:
+            while self._running:
+                if current is None:
+                    current = self._open_session(client)
+                    self._set_sink(current[1])
+                    self._force_restart = False
+                    session_start = time.monotonic()
+
+                task, audio = current
+                await asyncio.wait({task}, timeout=0.1)
+                if not self._running:
+                    break
+
+                if task.done():
+                    current = None
+                    self._set_sink(None)
+                    # Anything the pump read after this is already in _replay
+                    # and is newer than what the session left unsent.
+                    self._replay[:0] = self._drain(audio)
+                    err = None if task.cancelled() else task.exception()
+                    if err is None:
+                        consecutive_errors = 0
+                        continue
                     consecutive_errors += 1
-                    err_msg = str(e)
+                    err_msg = str(err)
                     delay = min(0.5 * consecutive_errors, 3.0)
                     logger.warning(
                         "STT stream error (#%d): %s. Restarting in %.1fs...",
@@ -143,16 +310,42 @@ class StreamingSTT:
                     )
                     if self.on_error:
                         self.on_error(f"STT error: {err_msg[:100]}")
-                    time.sleep(delay)
+                    await asyncio.sleep(delay)
+                    continue
+
+                elapsed = time.monotonic() - session_start
+                if self._force_restart or elapsed > handover_after:
+                    logger.info("Handing over to a new STT session (%.0fs elapsed)", elapsed)
+                    current = self._open_session(client)
+                    self._set_sink(current[1])
+                    self._force_restart = False
+                    session_start = time.monotonic()
+                    audio.put_nowait(None)
+                    self._retired.add(task)
+                    task.add_done_callback(self._retired.discard)
+                    task.add_done_callback(self._log_retired_session)
+        finally:
+            self._sink = None
+            pump.cancel()
+            if current is not None:
+                current[0].cancel()
+
+    def _run_loop(self):
+        asyncio.run(self._run_stream())
 
-    def force_restart(self):
-        """Force the stream to restart (e.g., to pick up new dynamic terms)."""
+    def force_restart(self, terms_changed: bool = False):
+        """Force the stream to restart (e.g., to pick up new dynamic terms).
+
+        Pass terms_changed=True to rebuild the cached phrase set on reconnect.
+        """
+        if terms_changed:
+            self._adaptation_dirty = True
         self._force_restart = True
         logger.info("STT stream force restart requested")
 
     def start(self):
         self._running = True
-        self._thread = threading.Thread(target=self._run_stream, daemon=True)
+        self._thread = threading.Thread(target=self._run_loop, daemon=True)
         self._thread.start()
         logger.info("STT streaming started")
 
@@ -1,59 +1,150 @@
 import threading
 from collections import defaultdict
+from contextlib import contextmanager
+
+
+class _RWLock:
+    """Many concurrent readers or one writer.
+
+    Writer-preferring: once a writer is waiting, new readers queue behind it,
+    so a burst of UI polls can't starve the STT callback.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class _SlideText:
+    """Append-only UTF-8 buffer of space-separated segments for one slide.
+
+    Appending is amortized O(1) and reading the whole slide is a single
+    decode, instead of re-joining a list of strings on every poll.
+    """
+
+    __slots__ = ("data", "starts")
+
+    def __init__(self):
+        self.data = bytearray()
+        self.starts: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def append(self, encoded: bytes):
+        if self.starts:
+            self.data += b" "
+        self.starts.append(len(self.data))
+        self.data += encoded
+
+    def replace_last(self, encoded: bytes):
+        del self.data[self.starts[-1]:]
+        self.data += encoded
+
+    def last_prefix(self, size: int) -> bytes:
+        start = self.starts[-1]
+        return bytes(self.data[start:start + size])
+
+    def snapshot(self) -> bytes:
+        return bytes(self.data)
 
 
 class TranscriptBuffer:
     """Accumulates transcript segments tagged by slide index."""
 
     def __init__(self):
-        self._lock = threading.Lock()
-        self._segments: dict[int, list[str]] = defaultdict(list)
-        self._archive: dict[int, list[str]] = defaultdict(list)
+        self._lock = _RWLock()
+        self._segments: dict[int, _SlideText] = defaultdict(_SlideText)
+        self._archive: dict[int, _SlideText] = defaultdict(_SlideText)
         self._interim: str = ""
+        # Byte length and hash of each slide's last segment, for prefix dedup.
+        self._last_len: dict[int, int] = {}
+        self._last_hash: dict[int, int] = {}
 
     def add_segment(self, text: str, slide_index: int, is_final: bool):
-        with self._lock:
+        encoded = text.encode("utf-8") if is_final else b""
+        with self._lock.write():
             if is_final:
                 segments = self._segments[slide_index]
-                if segments and text.startswith(segments[-1]):
-                    segments[-1] = text
+                last_len = self._last_len.get(slide_index, 0)
+                if segments and len(encoded) >= last_len and (
+                        hash(encoded[:last_len]) == self._last_hash[slide_index]):
+                    segments.replace_last(encoded)
                     if self._archive[slide_index]:
-                        self._archive[slide_index][-1] = text
-                elif segments and segments[-1].startswith(text):
+                        self._archive[slide_index].replace_last(encoded)
+                    self._last_len[slide_index] = len(encoded)
+                    self._last_hash[slide_index] = hash(encoded)
+                elif segments and hash(encoded) == hash(segments.last_prefix(len(encoded))):
                     pass
                 else:
-                    segments.append(text)
-                    self._archive[slide_index].append(text)
+                    segments.append(encoded)
+                    self._archive[slide_index].append(encoded)
+                    self._last_len[slide_index] = len(encoded)
+                    self._last_hash[slide_index] = hash(encoded)
                 self._interim = ""
             else:
                 self._interim = text
 
+    def _snapshot(self, store: dict[int, _SlideText], slide_index: int) -> bytes:
+        with self._lock.read():
+            slide = store.get(slide_index)
+            return slide.snapshot() if slide is not None else b""
+
     def get_slide_text(self, slide_index: int) -> str:
         """Get all accumulated final text for a slide."""
-        with self._lock:
-            return " ".join(self._segments.get(slide_index, []))
+        return self._snapshot(self._segments, slide_index).decode("utf-8")
 
     def get_current_interim(self) -> str:
-        with self._lock:
+        with self._lock.read():
             return self._interim
 
     def get_archived_text(self, slide_index: int) -> str:
         """Get all final text ever recorded for a slide (survives flush)."""
-        with self._lock:
-            return " ".join(self._archive.get(slide_index, []))
+        return self._snapshot(self._archive, slide_index).decode("utf-8")
 
     def flush_slide(self, slide_index: int) -> str:
         """Return and clear all text for a slide."""
-        with self._lock:
-            text = " ".join(self._segments.pop(slide_index, []))
-            return text
+        with self._lock.write():
+            slide = self._segments.pop(slide_index, None)
+            self._last_len.pop(slide_index, None)
+            self._last_hash.pop(slide_index, None)
+        return slide.data.decode("utf-8") if slide is not None else ""
 
     def has_enough_text(self, slide_index: int, min_chars: int) -> bool:
-        with self._lock:
-            text = " ".join(self._segments.get(slide_index, []))
-            return len(text) >= min_chars
+        return len(self.get_slide_text(slide_index)) >= min_chars
 
     def get_all_slide_indices(self) -> list[int]:
         """Return all slide indices that have archived text."""
-        with self._lock:
+        with self._lock.read():
             return sorted(self._archive.keys())
@@ -7,9 +7,11 @@ Usage:
     python -m tests.test_file_audio test_audio/lecture_sample.m4a
     python -m tests.test_file_audio test_audio/lecture_sample.m4a --duration 60
     python -m tests.test_file_audio test_audio/lecture_sample.m4a --refine
+    python -m tests.test_file_audio test_audio/lecture_sample.m4a --realtime
 """
 
 import argparse
+import functools
 import json
 import logging
 import os
@@ -17,8 +19,25 @@ import queue
 import struct
 import subprocess
 import sys
+import tempfile
 import threading
 import time
+import wave
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+
+import numpy as np
+
+try:
+    import imageio_ffmpeg
+except ImportError:
+    imageio_ffmpeg = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -35,14 +54,17 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Deepgram accepts large frames; 250 ms cuts WebSocket sends 2.5x vs 100 ms.
+CHUNK_MS = 250
+REFINE_BATCH_SIZE = 16
+REFINE_WORKERS = 8
 
+
+@functools.lru_cache(maxsize=1)
 def get_ffmpeg_path() -> str:
-    """Get ffmpeg binary path."""
-    try:
-        import imageio_ffmpeg
+    """Get ffmpeg binary path (resolved once per process)."""
+    if imageio_ffmpeg is not None:
         return imageio_ffmpeg.get_ffmpeg_exe()
-    except ImportError:
-        pass
     import shutil
     path = shutil.which("ffmpeg")
     if path:
@@ -52,18 +74,35 @@ def get_ffmpeg_path() -> str:
     )
 
 
-def decode_audio_to_pcm(input_path: str, sample_rate: int = 48000,
-                         duration: float = 0) -> bytes:
-    """Decode any audio file to raw PCM (mono, 16-bit, given sample rate).
+def iter_pcm_chunks(input_path: str, sample_rate: int = 48000,
+                    duration: float = 0,
+                    chunk_bytes: int = 48000 * 2 * CHUNK_MS // 1000) -> Iterator[bytes]:
+    """Decode any audio file to raw PCM (mono, 16-bit, given sample rate), streamed.
+
+    ffmpeg's output is read as it is produced, so transcription starts while
+    the file is still decoding and the full PCM is never held in memory.
 
     Args:
         input_path: Path to audio file (m4a, mp3, wav, etc.)
         sample_rate: Target sample rate in Hz
         duration: Max seconds to decode (0 = full file)
+        chunk_bytes: Size of each yielded chunk
 
-    Returns:
-        Raw PCM bytes (mono, int16, little-endian)
+    Yields:
+        Raw PCM chunks (mono, int16, little-endian)
     """
+    if input_path.lower().endswith(".wav"):
+        try:
+            wav = wave.open(input_path, "rb")
+        except (wave.Error, EOFError):
+            wav = None  # e.g. float or compressed WAV; let ffmpeg handle it
+        if wav is not None:
+            with wav:
+                if (wav.getframerate() == sample_rate
+                        and wav.getsampwidth() == 2):
+                    yield from _iter_wav_chunks(wav, duration, chunk_bytes)
+                    return
+
     ffmpeg = get_ffmpeg_path()
     cmd = [
         ffmpeg, "-i", input_path,
@@ -80,26 +119,78 @@ def decode_audio_to_pcm(input_path: str, sample_rate: int = 48000,
     logger.info("Decoding audio: %s (rate=%d, duration=%s)",
                 input_path, sample_rate, duration or "full")
 
-    result = subprocess.run(cmd, capture_output=True, check=True)
-    pcm_data = result.stdout
-    seconds = len(pcm_data) / (sample_rate * 2)
-    logger.info("Decoded %.1f seconds of audio (%d bytes)", seconds, len(pcm_data))
-    return pcm_data
+    # stderr goes to a temp file rather than a pipe: a pipe is only read at
+    # EOF, so enough error output would block ffmpeg while we wait on stdout.
+    with tempfile.TemporaryFile() as errfile:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=errfile,
+                                bufsize=1024 * 1024)
+        total_bytes = 0
+        finished = False
+        try:
+            while chunk := proc.stdout.read(chunk_bytes):
+                total_bytes += len(chunk)
+                yield chunk
+            finished = True
+        finally:
+            proc.stdout.close()
+            if not finished:
+                proc.kill()
+            returncode = proc.wait()
+
+        if returncode != 0:
+            errfile.seek(0)
+            raise subprocess.CalledProcessError(returncode, cmd, stderr=errfile.read())
+
+    seconds = total_bytes / (sample_rate * 2)
+    logger.info("Decoded %.1f seconds of audio (%d bytes)", seconds, total_bytes)
+
+
+def _iter_wav_chunks(wav: wave.Wave_read, duration: float,
+                     chunk_bytes: int) -> Iterator[bytes]:
+    """Read 16-bit PCM straight from a WAV already at the target rate."""
+    channels = wav.getnchannels()
+    frames_left = wav.getnframes()
+    if duration > 0:
+        frames_left = min(frames_left, int(duration * wav.getframerate()))
+    chunk_frames = max(1, chunk_bytes // 2)
 
+    logger.info("Reading WAV directly: %d ch, rate=%d, duration=%s",
+                channels, wav.getframerate(), duration or "full")
 
-def feed_audio_to_deepgram(pcm_data: bytes, config: Config,
+    total_bytes = 0
+    while frames_left > 0:
+        data = wav.readframes(min(chunk_frames, frames_left))
+        if not data:
+            break
+        frames_left -= len(data) // (2 * channels)
+        if channels > 1:
+            samples = np.frombuffer(data, dtype="<i2").reshape(-1, channels)
+            data = samples.mean(axis=1).astype("<i2").tobytes()
+        total_bytes += len(data)
+        yield data
+
+    seconds = total_bytes / (wav.getframerate() * 2)
+    logger.info("Decoded %.1f seconds of audio (%d bytes)", seconds, total_bytes)
+
+
+def feed_audio_to_deepgram(pcm_chunks: Iterable[bytes], config: Config,
                             sample_rate: int = 48000,
-                            chunk_ms: int = 100) -> list[dict]:
+                            chunk_ms: int = CHUNK_MS,
+                            realtime: bool = False) -> list[dict]:
     """Send PCM audio to Deepgram and collect transcripts.
 
+    Audio is sent as fast as the socket takes it unless ``realtime`` is set,
+    which paces it at 1.5x playback speed to simulate live capture.
+
     Args:
-        pcm_data: Raw PCM bytes (mono, int16)
+        pcm_chunks: Raw PCM chunks (mono, int16), chunk_ms long each
         config: Config with Deepgram API key
         sample_rate: Sample rate of PCM data
         chunk_ms: Chunk size in milliseconds
+        realtime: Pace the feed like live audio
 
     Returns:
-        List of transcript dicts: {text, is_final, words, confidence, time}
+        List of transcript dicts: {text, is_final, words, confidence}
     """
     from stt.deepgram_streaming import DeepgramStreamingSTT
 
@@ -115,7 +206,6 @@ def feed_audio_to_deepgram(pcm_data: bytes, config: Config,
                 "is_final": is_final,
                 "words": words,
                 "confidence": confidence,
-                "time": time.monotonic(),
             })
             if is_final:
                 conf_str = f"[{confidence:.2f}]" if confidence < 1.0 else ""
@@ -141,26 +231,29 @@ def feed_audio_to_deepgram(pcm_data: bytes, config: Config,
         raise RuntimeError("Deepgram connection timeout")
     logger.info("Deepgram connected. Feeding audio...")
 
-    chunk_bytes = int(sample_rate * 2 * chunk_ms / 1000)
-    total_chunks = len(pcm_data) // chunk_bytes
     chunk_interval = chunk_ms / 1000.0
 
     start_time = time.monotonic()
-    for i in range(0, len(pcm_data), chunk_bytes):
-        chunk = pcm_data[i:i + chunk_bytes]
-        if not chunk:
-            break
-        try:
-            audio_queue.put(chunk, timeout=1.0)
-        except queue.Full:
-            logger.warning("Audio queue full, dropping chunk")
-
-        elapsed = time.monotonic() - start_time
-        expected = (i // chunk_bytes) * chunk_interval / 1.5
-        if elapsed < expected:
-            time.sleep(expected - elapsed)
-
-    logger.info("Audio feed complete. Waiting for final transcripts...")
+    for i, chunk in enumerate(pcm_chunks):
+        # Block rather than drop: the WebSocket sender sets the pace.
+        while True:
+            try:
+                audio_queue.put(chunk, timeout=1.0)
+                break
+            except queue.Full:
+                if not stt._running:
+                    raise RuntimeError("Deepgram stopped while audio was still queued")
+
+        if realtime:
+            elapsed = time.monotonic() - start_time
+            expected = i * chunk_interval / 1.5
+            if elapsed < expected:
+                time.sleep(expected - elapsed)
+
+    logger.info("Audio feed complete. Waiting for the queue to drain...")
+    while not audio_queue.empty() and stt._running:
+        time.sleep(0.1)
+    logger.info("Waiting for final transcripts...")
     time.sleep(3.0)
 
     stt.stop()
@@ -169,105 +262,137 @@ def feed_audio_to_deepgram(pcm_data: bytes, config: Config,
     return results
 
 
-def run_postprocess(results: list[dict], config: Config) -> list[dict]:
+def run_postprocess(results: list[dict], config: Config,
+                    postprocessor: TranscriptPostProcessor | None = None) -> list[dict]:
     """Run post-processing on transcript results."""
-    postprocessor = TranscriptPostProcessor()
+    postprocessor = postprocessor or TranscriptPostProcessor()
 
     processed = []
-    for r in results:
-        if r["is_final"]:
-            original = r["text"]
-            fixed = postprocessor.process(original)
-            processed.append({
-                **r,
-                "original": original,
-                "text": fixed,
-                "changed": original != fixed,
-            })
+    for r in filter(itemgetter("is_final"), results):
+        original = r["text"]
+        fixed = postprocessor.process(original)
+        # Updated in place: nothing reads a final's raw text from results after this.
+        r["original"] = original
+        r["text"] = fixed
+        r["changed"] = original != fixed
+        processed.append(r)
 
     return processed
 
 
-def run_refinement(processed: list[dict], config: Config) -> list[dict]:
-    """Run LLM refinement on processed transcripts."""
-    refiner = TranscriptRefiner(config)
+def _refine_group(refiner: TranscriptRefiner, texts: list[str]) -> list[str | None]:
+    """Refine texts in one batched call; per-segment calls if the batch fails.
 
-    refined = []
-    for i, p in enumerate(processed):
-        original = p["text"]
+    None marks a segment whose refinement raised.
+    """
+    try:
+        results = refiner.refine_batch([(text, "") for text in texts])
+    except Exception as e:
+        logger.warning("Batch refinement failed, refining one by one: %s", e)
+        results = None
+    if results is not None:
+        return results
+
+    results = []
+    for text in texts:
         try:
-            result = refiner.refine(original)
-            refined.append({
-                **p,
-                "pre_refine": original,
-                "text": result,
-                "refined_changed": original != result,
-            })
-            if original != result:
-                print(f"  Refined [{i}]: {original}")
-                print(f"       →  : {result}")
+            results.append(refiner.refine(text))
         except Exception as e:
-            logger.warning("Refinement failed for segment %d: %s", i, e)
-            refined.append({**p, "pre_refine": original, "refined_changed": False})
+            logger.warning("Refinement failed for segment: %s", e)
+            results.append(None)
+    return results
+
+
+def run_refinement(processed: list[dict], config: Config,
+                   refiner: TranscriptRefiner | None = None) -> list[dict]:
+    """Run LLM refinement on processed transcripts.
+
+    Segments go out REFINE_BATCH_SIZE per request, with up to
+    REFINE_WORKERS requests in flight.
+    """
+    refiner = refiner or TranscriptRefiner(config)
+
+    texts = [p["text"] for p in processed]
+    groups = [texts[i:i + REFINE_BATCH_SIZE] for i in range(0, len(texts), REFINE_BATCH_SIZE)]
+    with ThreadPoolExecutor(max_workers=REFINE_WORKERS) as executor:
+        outputs = [
+            result
+            for group in executor.map(lambda g: _refine_group(refiner, g), groups)
+            for result in group
+        ]
+
+    refined = []
+    for i, (p, result) in enumerate(zip(processed, outputs)):
+        # Copied, not mutated: print_summary still shows the post-processed text.
+        r = p.copy()
+        original = p["text"]
+        r["pre_refine"] = original
+        r["refined_changed"] = result is not None and original != result
+        if result is not None:
+            r["text"] = result
+        refined.append(r)
+        if r["refined_changed"]:
+            print(f"  Refined [{i}]: {original}")
+            print(f"       →  : {result}")
 
     return refined
 
 
 def print_summary(results: list[dict], processed: list[dict],
                   refined: list[dict] | None = None):
-    """Print a summary of the test results."""
-    print("\n" + "=" * 70)
-    print("TEST SUMMARY")
-    print("=" * 70)
+    """Print a summary of the test results (assembled, then written once)."""
+    out = ["", "=" * 70, "TEST SUMMARY", "=" * 70]
 
     finals = [r for r in results if r["is_final"]]
     interims = [r for r in results if not r["is_final"]]
 
-    print(f"\nTotal messages: {len(results)}")
-    print(f"  Final: {len(finals)}")
-    print(f"  Interim: {len(interims)}")
+    out.append(f"\nTotal messages: {len(results)}")
+    out.append(f"  Final: {len(finals)}")
+    out.append(f"  Interim: {len(interims)}")
 
     if finals:
-        confidences = [r["confidence"] for r in finals]
-        print(f"\nConfidence stats (finals):")
-        print(f"  Min: {min(confidences):.3f}")
-        print(f"  Max: {max(confidences):.3f}")
-        print(f"  Avg: {sum(confidences)/len(confidences):.3f}")
-
-        low_conf = [r for r in finals if r["confidence"] < 0.4]
-        very_low = [r for r in finals if r["confidence"] < 0.15]
-        print(f"  Low confidence (<0.4): {len(low_conf)}")
-        print(f"  Very low (<0.15, would be skipped): {len(very_low)}")
+        conf = np.sort(np.fromiter((r["confidence"] for r in finals),
+                                   dtype=np.float64, count=len(finals)))
+        very_low, low = np.searchsorted(conf, (0.15, 0.4))
+        out.append(f"\nConfidence stats (finals):")
+        out.append(f"  Min: {conf[0]:.3f}")
+        out.append(f"  Max: {conf[-1]:.3f}")
+        out.append(f"  Avg: {conf.mean():.3f}")
+        out.append(f"  Low confidence (<0.4): {int(low)}")
+        out.append(f"  Very low (<0.15, would be skipped): {int(very_low)}")
 
     if processed:
-        changed = [p for p in processed if p.get("changed")]
-        print(f"\nPost-processing:")
-        print(f"  Total segments: {len(processed)}")
-        print(f"  Changed by postprocessor: {len(changed)}")
-        if changed:
-            print(f"  Examples of changes:")
-            for p in changed[:5]:
-                print(f"    '{p['original']}' → '{p['text']}'")
+        changed = np.fromiter((p.get("changed", False) for p in processed),
+                              dtype=bool, count=len(processed))
+        out.append(f"\nPost-processing:")
+        out.append(f"  Total segments: {len(processed)}")
+        out.append(f"  Changed by postprocessor: {int(changed.sum())}")
+        if changed.any():
+            out.append(f"  Examples of changes:")
+            for p in map(processed.__getitem__, np.flatnonzero(changed)[:5]):
+                out.append(f"    '{p['original']}' → '{p['text']}'")
 
     if refined:
         ref_changed = [r for r in refined if r.get("refined_changed")]
-        print(f"\nRefinement:")
-        print(f"  Changed by refiner: {len(ref_changed)}/{len(refined)}")
+        out.append(f"\nRefinement:")
+        out.append(f"  Changed by refiner: {len(ref_changed)}/{len(refined)}")
 
-    print(f"\n{'=' * 70}")
-    print("FULL TRANSCRIPT (post-processed)")
-    print("=" * 70)
+    out.append(f"\n{'=' * 70}")
+    out.append("FULL TRANSCRIPT (post-processed)")
+    out.append("=" * 70)
     for p in processed:
         marker = " *" if p.get("changed") else ""
-        print(f"  {p['text']}{marker}")
+        out.append(f"  {p['text']}{marker}")
 
     if refined:
-        print(f"\n{'=' * 70}")
-        print("FULL TRANSCRIPT (refined)")
-        print("=" * 70)
+        out.append(f"\n{'=' * 70}")
+        out.append("FULL TRANSCRIPT (refined)")
+        out.append("=" * 70)
         for r in refined:
             marker = " *" if r.get("refined_changed") else ""
-            print(f"  {r['text']}{marker}")
+            out.append(f"  {r['text']}{marker}")
+
+    sys.stdout.write("\n".join(out) + "\n")
 
 
 def main():
@@ -277,6 +402,8 @@ def main():
                         help="Max seconds to process (default: 120)")
     parser.add_argument("--sample-rate", type=int, default=48000,
                         help="Sample rate for STT (default: 48000)")
+    parser.add_argument("--realtime", action="store_true",
+                        help="Pace audio at 1.5x playback speed (default: as fast as possible)")
     parser.add_argument("--refine", action="store_true",
                         help="Also run LLM refinement (uses OpenAI API)")
     parser.add_argument("--output", type=str, default="",
@@ -289,17 +416,18 @@ def main():
         print("ERROR: DEEPGRAM_API_KEY not set in .env")
         sys.exit(1)
 
-    print(f"\n[1/3] Decoding audio: {args.audio_file}")
-    pcm_data = decode_audio_to_pcm(
+    print(f"\n[1/2] Decoding and streaming to Deepgram STT: {args.audio_file}")
+    pcm_chunks = iter_pcm_chunks(
         args.audio_file,
         sample_rate=args.sample_rate,
         duration=args.duration,
+        chunk_bytes=int(args.sample_rate * 2 * CHUNK_MS / 1000),
+    )
+    results = feed_audio_to_deepgram(
+        pcm_chunks, config, args.sample_rate, realtime=args.realtime,
     )
 
-    print(f"\n[2/3] Streaming to Deepgram STT...")
-    results = feed_audio_to_deepgram(pcm_data, config, args.sample_rate)
-
-    print(f"\n[3/3] Post-processing transcripts...")
+    print(f"\n[2/2] Post-processing transcripts...")
     processed = run_postprocess(results, config)
 
     refined = None
@@ -310,25 +438,36 @@ def main():
     print_summary(results, processed, refined)
 
     if args.output:
+        # refined[i] is the refinement of processed[i]; build both lists in one walk.
+        processed_out = []
+        refined_out = []
+        for i, p in enumerate(processed):
+            processed_out.append(
+                {"text": p["text"], "original": p.get("original", ""),
+                 "confidence": p["confidence"], "changed": p.get("changed", False)}
+            )
+            if refined:
+                r = refined[i]
+                refined_out.append(
+                    {"text": r["text"], "pre_refine": r.get("pre_refine", ""),
+                     "refined_changed": r.get("refined_changed", False)}
+                )
+
         output_data = {
             "audio_file": args.audio_file,
             "duration": args.duration,
             "sample_rate": args.sample_rate,
             "results_count": len(results),
-            "processed": [
-                {"text": p["text"], "original": p.get("original", ""),
-                 "confidence": p["confidence"], "changed": p.get("changed", False)}
-                for p in processed
-            ],
+            "processed": processed_out,
         }
         if refined:
-            output_data["refined"] = [
-                {"text": r["text"], "pre_refine": r.get("pre_refine", ""),
-                 "refined_changed": r.get("refined_changed", False)}
-                for r in refined
-            ]
-        with open(args.output, "w", encoding="utf-8") as f:
-            json.dump(output_data, f, ensure_ascii=False, indent=2)
+            output_data["refined"] = refined_out
+        if orjson is not None:
+            with open(args.output, "wb") as f:
+                f.write(orjson.dumps(output_data, option=orjson.OPT_INDENT_2))
+        else:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(output_data, f, ensure_ascii=False, indent=2)
         print(f"\nResults saved to {args.output}")
 
 
@@ -5,20 +5,27 @@
 - GUI env check logic
 """
 
-import os
 import re
-import struct
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock
+
+import numpy as np
 
 
 class TestBoneMetabolismTerms(unittest.TestCase):
     """Test that bone metabolism/endocrinology terms are properly loaded."""
 
+    @classmethod
+    def setUpClass(cls):
+        from stt.korean_dict import get_builtin_korean_to_english
+        from medical.terms import get_all_medical_terms
+        cls.all_terms = get_builtin_korean_to_english()
+        cls.term_dict = dict(get_all_medical_terms())
+        cls.term_names = set(cls.term_dict)
+
     def test_korean_dict_has_bone_terms(self):
         """korean_dict includes BONE_METABOLISM_TERMS."""
-        from stt.korean_dict import get_builtin_korean_to_english
-        all_terms = get_builtin_korean_to_english()
+        all_terms = self.all_terms
 
         self.assertEqual(all_terms["오스테오칼신"], "osteocalcin")
         self.assertEqual(all_terms["오스테오클라스트"], "osteoclast")
@@ -32,8 +39,7 @@ class TestBoneMetabolismTerms(unittest.TestCase):
 
     def test_korean_dict_has_pth_terms(self):
         """korean_dict includes parathyroid/calcium metabolism terms."""
-        from stt.korean_dict import get_builtin_korean_to_english
-        all_terms = get_builtin_korean_to_english()
+        all_terms = self.all_terms
 
         self.assertEqual(all_terms["파라토르몬"], "parathyroid hormone")
         self.assertEqual(all_terms["피티에이치"], "PTH")
@@ -42,34 +48,22 @@ class TestBoneMetabolismTerms(unittest.TestCase):
 
     def test_medical_terms_has_bone_ko(self):
         """medical/terms.py has Korean bone metabolism terms for STT boosting."""
-        from medical.terms import get_all_medical_terms
-        all_terms = get_all_medical_terms()
-        term_names = {t for t, _ in all_terms}
-
         bone_ko_terms = ["골표지자", "골밀도", "골흡수", "골형성", "파골세포",
                          "조골세포", "비스포스포네이트", "데노수맙"]
         for term in bone_ko_terms:
-            self.assertIn(term, term_names, f"Missing Korean bone term: {term}")
+            self.assertIn(term, self.term_names, f"Missing Korean bone term: {term}")
 
     def test_medical_terms_has_bone_en(self):
         """medical/terms.py has English bone metabolism terms for STT boosting."""
-        from medical.terms import get_all_medical_terms
-        all_terms = get_all_medical_terms()
-        term_names = {t for t, _ in all_terms}
-
         bone_en_terms = ["bone turnover marker", "CTX", "P1NP", "osteocalcin",
                          "bisphosphonate", "denosumab", "DEXA", "T-score", "RANKL"]
         for term in bone_en_terms:
-            self.assertIn(term, term_names, f"Missing English bone term: {term}")
+            self.assertIn(term, self.term_names, f"Missing English bone term: {term}")
 
     def test_osteoporosis_boosted(self):
         """Osteoporosis should have high boost value (20)."""
-        from medical.terms import get_all_medical_terms
-        all_terms = get_all_medical_terms()
-        term_dict = {t: b for t, b in all_terms}
-
-        self.assertEqual(term_dict.get("골다공증"), 20)
-        self.assertEqual(term_dict.get("osteoporosis"), 20)
+        self.assertEqual(self.term_dict.get("골다공증"), 20)
+        self.assertEqual(self.term_dict.get("osteoporosis"), 20)
 
 
 class TestAudioResamplerNumpy(unittest.TestCase):
@@ -81,20 +75,18 @@ class TestAudioResamplerNumpy(unittest.TestCase):
         resampler = AudioResampler(2, 48000)
         resampler._use_audioop = False
 
-        stereo = struct.pack("<hh", 1000, 2000) * 100
+        stereo = np.tile(np.array([1000, 2000], dtype="<i2"), 100).tobytes()
         mono = resampler.to_mono(stereo)
 
         self.assertEqual(len(mono), len(stereo) // 2)
-
-        first_sample = struct.unpack("<h", mono[:2])[0]
-        self.assertEqual(first_sample, 1500)
+        self.assertEqual(np.frombuffer(mono, "<i2", count=1)[0], 1500)
 
     def test_mono_passthrough(self):
         """Mono input passes through unchanged."""
         from audio.resampler import AudioResampler
         resampler = AudioResampler(1, 48000)
 
-        mono_in = struct.pack("<h", 1234) * 100
+        mono_in = np.full(100, 1234, dtype="<i2").tobytes()
         mono_out = resampler.to_mono(mono_in)
         self.assertEqual(mono_in, mono_out)
 
@@ -115,100 +107,90 @@ class TestAudioResamplerNumpy(unittest.TestCase):
         resampler_numpy = AudioResampler(2, 48000)
         resampler_numpy._use_audioop = False
 
-        import random
-        random.seed(42)
-        stereo_data = bytes(
-            b for _ in range(1000)
-            for v in [random.randint(-32768, 32767), random.randint(-32768, 32767)]
-            for b in struct.pack("<h", v)
-        )
+        rng = np.random.default_rng(42)
+        stereo_data = rng.integers(-32768, 32768, size=(1000, 2), dtype=np.int16).tobytes()
 
         mono_audioop = resampler_audioop.to_mono(stereo_data)
         mono_numpy = resampler_numpy.to_mono(stereo_data)
 
         self.assertEqual(len(mono_audioop), len(mono_numpy))
 
-        for i in range(0, len(mono_audioop), 2):
-            a = struct.unpack("<h", mono_audioop[i:i+2])[0]
-            n = struct.unpack("<h", mono_numpy[i:i+2])[0]
-            self.assertAlmostEqual(a, n, delta=1,
-                                   msg=f"Sample {i//2}: audioop={a}, numpy={n}")
+        a = np.frombuffer(mono_audioop, dtype="<i2").astype(np.int32)
+        n = np.frombuffer(mono_numpy, dtype="<i2").astype(np.int32)
+        np.testing.assert_allclose(a, n, rtol=0, atol=1)
+
+
+class TestAudioRingBuffer(unittest.TestCase):
+    """Test the resampler -> STT audio ring buffer."""
+
+    def test_reads_coalesce_and_wrap(self):
+        """Buffered chunks come back in order, across the wrap point."""
+        from audio.ring import AudioRingBuffer
+        ring = AudioRingBuffer(capacity=10, max_read=6)
+
+        ring.put_nowait(b"abcd")
+        ring.put_nowait(b"ef")
+        self.assertEqual(ring.get_nowait(), b"abcdef")
+        ring.put_nowait(b"ghijklm")
+        self.assertEqual(ring.get_nowait(), b"ghijkl")
+        self.assertEqual(ring.get_nowait(), b"m")
+
+    def test_full_and_empty(self):
+        """Overflow raises queue.Full; an empty read times out with queue.Empty."""
+        import queue
+        from audio.ring import AudioRingBuffer
+        ring = AudioRingBuffer(capacity=4)
+
+        ring.put_nowait(b"abc")
+        with self.assertRaises(queue.Full):
+            ring.put_nowait(b"de")
+        self.assertEqual(ring.get(timeout=0.1), b"abc")
+        with self.assertRaises(queue.Empty):
+            ring.get(timeout=0.05)
 
 
 class TestEnvCheck(unittest.TestCase):
     """Test GUI env check logic respects STT provider."""
 
-    @patch.dict(os.environ, {
-        "STT_PROVIDER": "deepgram",
-        "DEEPGRAM_API_KEY": "test_key",
-        "OPENAI_API_KEY": "test_key",
-    }, clear=False)
     def test_deepgram_no_gcp_warning(self):
         """With Deepgram provider, missing GCP keys should NOT trigger warning."""
-        env = os.environ.copy()
-        env.pop("GCP_PROJECT_ID", None)
-        env.pop("GOOGLE_APPLICATION_CREDENTIALS", None)
-
-        with patch.dict(os.environ, env, clear=True):
-            missing = []
-            stt_provider = os.getenv("STT_PROVIDER", "deepgram")
-            if stt_provider == "deepgram":
-                if not os.getenv("DEEPGRAM_API_KEY"):
-                    missing.append("DEEPGRAM_API_KEY")
-            else:
-                if not os.getenv("GCP_PROJECT_ID"):
-                    missing.append("GCP_PROJECT_ID")
-            if not os.getenv("OPENAI_API_KEY"):
-                missing.append("OPENAI_API_KEY")
-
-            self.assertEqual(len(missing), 0)
-
-    @patch.dict(os.environ, {
-        "STT_PROVIDER": "google",
-        "OPENAI_API_KEY": "test_key",
-    }, clear=True)
+        from config import compute_missing
+        env = {
+            "STT_PROVIDER": "deepgram",
+            "DEEPGRAM_API_KEY": "test_key",
+            "OPENAI_API_KEY": "test_key",
+        }
+        self.assertEqual(compute_missing(env), set())
+
     def test_google_warns_about_gcp(self):
         """With Google provider, missing GCP keys should trigger warning."""
-        missing = []
-        stt_provider = os.getenv("STT_PROVIDER", "deepgram")
-        if stt_provider == "deepgram":
-            if not os.getenv("DEEPGRAM_API_KEY"):
-                missing.append("DEEPGRAM_API_KEY")
-        else:
-            if not os.getenv("GCP_PROJECT_ID"):
-                missing.append("GCP_PROJECT_ID")
-        if not os.getenv("OPENAI_API_KEY"):
-            missing.append("OPENAI_API_KEY")
-
-        self.assertIn("GCP_PROJECT_ID", missing)
+        from config import compute_missing
+        env = {"STT_PROVIDER": "google", "OPENAI_API_KEY": "test_key"}
+        self.assertIn("GCP_PROJECT_ID", compute_missing(env))
 
 
 class TestPostProcessorKoreanCorrections(unittest.TestCase):
     """Test postprocessor Korean->Korean corrections."""
 
-    def test_process_korean_only(self):
-        """process() only does Korean->Korean corrections, no English."""
+    @classmethod
+    def setUpClass(cls):
         from stt.postprocess import TranscriptPostProcessor
-        proc = TranscriptPostProcessor()
+        cls.proc = TranscriptPostProcessor()
 
-        result = proc.process("골프지자 검사를 하겠습니다")
+    def test_process_korean_only(self):
+        """process() only does Korean->Korean corrections, no English."""
+        result = self.proc.process("골프지자 검사를 하겠습니다")
         self.assertIn("골표지자", result)
         self.assertNotIn("골프지자", result)
 
     def test_new_correction_variants(self):
         """New correction variants work."""
-        from stt.postprocess import TranscriptPostProcessor
-        proc = TranscriptPostProcessor()
-
-        self.assertIn("골표지자", proc.process("골프이자 검사"))
-        self.assertIn("골표지자", proc.process("골프골프이자 검사"))
+        self.assertIn("골표지자", self.proc.process("골프이자 검사"))
+        self.assertIn("골표지자", self.proc.process("골프골프이자 검사"))
 
     def test_no_english_conversion(self):
         """process() does NOT convert Korean->English."""
-        from stt.postprocess import TranscriptPostProcessor
-        proc = TranscriptPostProcessor()
-
-        result = proc.process("오스테오포로시스 환자")
+        result = self.proc.process("오스테오포로시스 환자")
         self.assertNotIn("osteoporosis", result)
         self.assertIn("오스테오포로시스", result)
 
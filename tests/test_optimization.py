@@ -6,27 +6,36 @@
 - Deepgram keyword URL building
 """
 
+import functools
 import threading
 import time
 import unittest
+from collections import OrderedDict
+from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
 
+@functools.cache
+def _compute_slide():
+    """LectureNotetaker._compute_slide_for_utterance, imported on first use."""
+    from main import LectureNotetaker
+    return LectureNotetaker._compute_slide_for_utterance
+
+
+def _fake_notetaker(**attrs):
+    """Plain stand-in for LectureNotetaker with the slide-assignment state bound."""
+    obj = SimpleNamespace(current_slide=0, _slide_timeline=[], _slide_grace_sec=5.0)
+    obj.__dict__.update(attrs)
+    obj._compute_slide_for_utterance = functools.partial(_compute_slide(), obj)
+    return obj
+
+
 class TestTimestampSlideAssignment(unittest.TestCase):
     """Test _compute_slide_for_utterance() with various timestamp patterns."""
 
     def _make_notetaker(self):
         """Create a minimal LectureNotetaker-like object for testing."""
-        obj = MagicMock()
-        obj.current_slide = 0
-        obj._slide_timeline = []
-        obj._slide_grace_sec = 5.0
-
-        from main import LectureNotetaker
-        obj._compute_slide_for_utterance = (
-            LectureNotetaker._compute_slide_for_utterance.__get__(obj)
-        )
-        return obj
+        return _fake_notetaker()
 
     def test_no_timeline_returns_current(self):
         """With no slide changes, always return current slide."""
@@ -146,16 +155,33 @@ class TestTimestampSlideAssignment(unittest.TestCase):
         self.assertEqual(result, 1)
 
 
-class TestRefinerBuffer(unittest.TestCase):
-    """Test RefinerBuffer batch processing logic."""
+class _RefinedWaiter:
+    """Mixin: an on_refined callback that tests can block on."""
 
-    def _make_buffer(self, max_segments=3, flush_timeout=8.0):
-        refiner = MagicMock()
-        refiner.refine.return_value = "refined text"
+    def _record_refined(self):
+        """Return (results, on_refined); each call appends and signals."""
         results = []
+        self.refined = threading.Semaphore(0)
 
         def on_refined(text, slide_idx):
             results.append((text, slide_idx))
+            self.refined.release()
+
+        return results, on_refined
+
+    def _wait_refined(self, count=1, timeout=2.0):
+        """Block until on_refined has fired ``count`` more times."""
+        for _ in range(count):
+            self.assertTrue(self.refined.acquire(timeout=timeout))
+
+
+class TestRefinerBuffer(_RefinedWaiter, unittest.TestCase):
+    """Test RefinerBuffer batch processing logic."""
+
+    def _make_buffer(self, flush_interval=8.0):
+        refiner = MagicMock()
+        refiner.refine.return_value = "refined text"
+        results, on_refined = self._record_refined()
 
         def get_context(slide_idx, transcript=""):
             return f"context for slide {slide_idx}"
@@ -163,79 +189,178 @@ class TestRefinerBuffer(unittest.TestCase):
         from stt.refiner import RefinerBuffer
         buf = RefinerBuffer(
             refiner, on_refined, get_context,
-            max_segments=max_segments, flush_timeout_sec=flush_timeout,
+            flush_interval_sec=flush_interval,
         )
         return buf, refiner, results
 
-    def test_flush_on_max_segments(self):
-        """Buffer flushes when max_segments reached."""
-        buf, refiner, results = self._make_buffer(max_segments=3)
+    def test_segments_within_interval_batched(self):
+        """Segments added before the interval elapses go out as one refine."""
+        buf, refiner, results = self._make_buffer(flush_interval=0.3)
 
         buf.add("segment 1", 0)
         buf.add("segment 2", 0)
+        buf.add("segment 3", 0)
         self.assertEqual(len(results), 0)
 
-        buf.add("segment 3", 0)
-        time.sleep(0.3)
+        self._wait_refined()
         self.assertEqual(len(results), 1)
         refiner.refine.assert_called_once()
-        call_args = refiner.refine.call_args[0]
-        self.assertIn("segment 1", call_args[0])
-        self.assertIn("segment 3", call_args[0])
+        combined, context = refiner.refine.call_args[0]
+        self.assertEqual(combined, "segment 1 segment 2 segment 3")
+        self.assertEqual(context, "context for slide 0")
 
     def test_flush_on_slide_change(self):
         """Buffer flushes when slide changes."""
-        buf, refiner, results = self._make_buffer(max_segments=5)
+        buf, refiner, results = self._make_buffer()
 
         buf.add("text for slide 0", 0)
         buf.add("more text", 0)
         buf.add("text for slide 1", 1)
-        time.sleep(0.3)
+        self._wait_refined()
 
         self.assertGreaterEqual(len(results), 1)
         self.assertEqual(results[0][1], 0)
 
-    def test_flush_on_timeout(self):
-        """Buffer flushes after timeout."""
-        buf, refiner, results = self._make_buffer(
-            max_segments=10, flush_timeout=0.5,
-        )
+    def test_interval_counts_from_first_segment(self):
+        """Later adds don't push the flush back."""
+        buf, refiner, results = self._make_buffer(flush_interval=0.5)
 
+        start = time.monotonic()
         buf.add("segment 1", 0)
+        time.sleep(0.3)
+        buf.add("segment 2", 0)
         self.assertEqual(len(results), 0)
 
-        time.sleep(1.0)
+        self._wait_refined()
+        self.assertLess(time.monotonic() - start, 0.75)
         self.assertEqual(len(results), 1)
 
     def test_manual_flush(self):
         """Manual flush() clears buffer."""
-        buf, refiner, results = self._make_buffer(max_segments=10)
+        buf, refiner, results = self._make_buffer()
 
         buf.add("segment 1", 0)
         buf.add("segment 2", 0)
         buf.flush()
-        time.sleep(0.3)
+        self._wait_refined()
 
         self.assertEqual(len(results), 1)
 
+    def test_queued_flushes_coalesced(self):
+        """Flushes queued behind an in-flight refine go out as one batch call."""
+        buf, refiner, results = self._make_buffer()
+        release = threading.Event()
+
+        def slow_refine(text, context):
+            release.wait(timeout=2.0)
+            return "refined text"
+
+        refiner.refine.side_effect = slow_refine
+        refiner.refine_batch.return_value = ["refined 1", "refined 2"]
+
+        buf.add("slide 0", 0)
+        buf.flush()
+        time.sleep(0.1)
+        buf.add("slide 1", 1)
+        buf.add("slide 2", 2)
+        buf.flush()
+        release.set()
+        self.assertTrue(buf.wait_pending(timeout=2.0))
+
+        refiner.refine_batch.assert_called_once()
+        self.assertEqual(
+            results,
+            [("refined text", 0), ("refined 1", 1), ("refined 2", 2)],
+        )
+
+    def test_repeated_text_redelivered_without_refine(self):
+        """A repeated flush for a slide re-sends the earlier refinement, no API call."""
+        buf, refiner, results = self._make_buffer()
+
+        for slide_idx in (0, 0, 1):
+            buf.add("same text", slide_idx)
+            buf.flush()
+            self.assertTrue(buf.wait_pending(timeout=2.0))
+
+        self.assertEqual(refiner.refine.call_count, 2)
+        self.assertEqual(
+            results,
+            [("refined text", 0), ("refined text", 0), ("refined text", 1)],
+        )
+
     def test_empty_flush_noop(self):
         """Flushing empty buffer does nothing."""
         buf, refiner, results = self._make_buffer()
         buf.flush()
-        time.sleep(0.1)
+        self.assertTrue(buf.wait_pending(timeout=2.0))
         self.assertEqual(len(results), 0)
         refiner.refine.assert_not_called()
 
 
+class TestTranscriptBufferDedup(unittest.TestCase):
+    """Test prefix dedup of final segments in TranscriptBuffer."""
+
+    def test_extension_replaces_last_segment(self):
+        from stt.transcript import TranscriptBuffer
+        buf = TranscriptBuffer()
+        buf.add_segment("골밀도가", 0, True)
+        buf.add_segment("골밀도가 감소함", 0, True)
+        self.assertEqual(buf.get_slide_text(0), "골밀도가 감소함")
+        self.assertEqual(buf.get_archived_text(0), "골밀도가 감소함")
+
+    def test_prefix_of_last_segment_ignored(self):
+        from stt.transcript import TranscriptBuffer
+        buf = TranscriptBuffer()
+        buf.add_segment("골밀도가 감소함", 0, True)
+        buf.add_segment("골밀도가", 0, True)
+        buf.add_segment("골절 위험", 0, True)
+        self.assertEqual(buf.get_slide_text(0), "골밀도가 감소함 골절 위험")
+
+    def test_flush_resets_dedup_state(self):
+        from stt.transcript import TranscriptBuffer
+        buf = TranscriptBuffer()
+        buf.add_segment("hello world", 0, True)
+        self.assertEqual(buf.flush_slide(0), "hello world")
+        buf.add_segment("hello", 0, True)
+        self.assertEqual(buf.get_slide_text(0), "hello")
+        self.assertEqual(buf.get_archived_text(0), "hello world hello")
+
+    def test_readers_share_lock(self):
+        """Two readers can hold the lock at once; a writer waits for both."""
+        from stt.transcript import _RWLock
+        lock = _RWLock()
+        both_in = threading.Barrier(2, timeout=2)
+        wrote = threading.Event()
+        entered = []
+
+        def reader():
+            with lock.read():
+                both_in.wait()
+                entered.append(True)
+
+        threads = [threading.Thread(target=reader) for _ in range(2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(timeout=3)
+        self.assertEqual(len(entered), 2)
+
+        def writer():
+            with lock.write():
+                wrote.set()
+
+        threading.Thread(target=writer).start()
+        self.assertTrue(wrote.wait(timeout=2))
+
+
 class TestThreadSafety(unittest.TestCase):
     """Test thread-safe access to dynamic terms."""
 
     def test_concurrent_add(self):
         """Multiple threads adding terms concurrently."""
-        from medical.terms import _dynamic_terms, _lock
+        from medical.terms import clear_dynamic_terms
 
-        with _lock:
-            _dynamic_terms.clear()
+        clear_dynamic_terms()
 
         from medical.terms import add_dynamic_terms
 
@@ -260,15 +385,40 @@ class TestThreadSafety(unittest.TestCase):
         dynamic = get_dynamic_terms()
         self.assertEqual(len(dynamic), 500)
 
-        with _lock:
-            _dynamic_terms.clear()
+        clear_dynamic_terms()
+
+    def test_known_terms_skip_lock(self):
+        """Re-adding known terms neither locks nor duplicates them."""
+        from medical import terms
+
+        terms.clear_dynamic_terms()
+        terms.add_dynamic_terms(["known_a", "known_b"])
+        with patch.object(terms, "_lock", MagicMock()) as lock:
+            terms.add_dynamic_terms([" known_a", "known_b", "x"])
+        lock.__enter__.assert_not_called()
+        self.assertEqual(
+            terms.get_dynamic_terms(), (("known_a", 15), ("known_b", 15)),
+        )
+        terms.clear_dynamic_terms()
+
+    def test_all_terms_rebuilt_only_after_write(self):
+        """get_all_medical_terms reuses its merge until the dynamic terms change."""
+        from medical import terms
+
+        terms.clear_dynamic_terms()
+        first = terms.get_all_medical_terms()
+        self.assertIs(terms.get_all_medical_terms(), first)
+        terms.add_dynamic_terms(["cache_term"])
+        second = terms.get_all_medical_terms()
+        self.assertIsNot(second, first)
+        self.assertEqual(second[-1], ("cache_term", 15))
+        terms.clear_dynamic_terms()
 
     def test_concurrent_read_write(self):
         """One thread writing, multiple threads reading."""
-        from medical.terms import _dynamic_terms, _lock
+        from medical.terms import clear_dynamic_terms
 
-        with _lock:
-            _dynamic_terms.clear()
+        clear_dynamic_terms()
 
         from medical.terms import add_dynamic_terms, get_all_medical_terms
 
@@ -301,33 +451,36 @@ class TestThreadSafety(unittest.TestCase):
 
         self.assertEqual(len(errors), 0, f"Errors: {errors}")
 
-        with _lock:
-            _dynamic_terms.clear()
+        clear_dynamic_terms()
 
 
 class TestConfidenceFilter(unittest.TestCase):
     """Test confidence-based transcript filtering."""
 
-    def _make_notetaker(self):
-        obj = MagicMock()
+    @classmethod
+    def setUpClass(cls):
+        from main import LectureNotetaker
+        cls.obj = _fake_notetaker(
+            gui=MagicMock(),
+            postprocessor=MagicMock(**{"process.return_value": "processed"}),
+            transcript_buffer=MagicMock(),
+            refined_texts={},
+            refiner_buffer=MagicMock(),
+            _refine_async=MagicMock(),
+        )
+        cls.obj._on_transcript = LectureNotetaker._on_transcript.__get__(cls.obj)
+
+    def setUp(self):
+        obj = self.obj
         obj.current_slide = 0
         obj._slide_timeline = [(100.0, 0)]
-        obj._slide_grace_sec = 5.0
+        obj.refined_texts.clear()
+        for mock in (obj.gui, obj.postprocessor, obj.transcript_buffer,
+                     obj.refiner_buffer, obj._refine_async):
+            mock.reset_mock()
 
-        from main import LectureNotetaker
-        obj._compute_slide_for_utterance = (
-            LectureNotetaker._compute_slide_for_utterance.__get__(obj)
-        )
-        obj._on_transcript = (
-            LectureNotetaker._on_transcript.__get__(obj)
-        )
-        obj.gui = MagicMock()
-        obj.postprocessor = MagicMock()
-        obj.postprocessor.process.return_value = "processed"
-        obj.transcript_buffer = MagicMock()
-        obj.refined_texts = {}
-        obj.refiner_buffer = MagicMock()
-        return obj
+    def _make_notetaker(self):
+        return self.obj
 
     def test_very_low_confidence_skipped(self):
         """Confidence < 0.15 -> skipped entirely."""
@@ -359,54 +512,187 @@ class TestConfidenceFilter(unittest.TestCase):
         obj.gui.live_update_interim.assert_called_once_with("interim")
 
 
+class TestPhraseSetCache(unittest.TestCase):
+    """On-disk cache of the serialized static phrase set."""
+
+    def setUp(self):
+        import tempfile
+        from pathlib import Path
+        from stt import streaming
+
+        self.streaming = streaming
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = patch.object(streaming, "PHRASE_SET_CACHE_DIR", Path(tmp.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        streaming._static_adaptation_blob.cache_clear()
+        self.addCleanup(streaming._static_adaptation_blob.cache_clear)
+
+    def _phrase_count(self, blob):
+        from google.cloud.speech_v2.types import cloud_speech
+        adaptation = cloud_speech.SpeechAdaptation.deserialize(blob)
+        return sum(len(ps.inline_phrase_set.phrases) for ps in adaptation.phrase_sets)
+
+    def test_corrupt_cache_rebuilt(self):
+        """Garbage or a truncated file is replaced instead of breaking every session."""
+        streaming = self.streaming
+        terms = streaming._static_phrase_terms()
+        path = streaming._phrase_set_cache_path(terms)
+        good = streaming._static_adaptation_blob()
+        self.assertEqual(path.read_bytes(), good)
+
+        for garbage in (b"\xff\xfe not a protobuf", good[:len(good) // 2]):
+            path.write_bytes(garbage)
+            streaming._static_adaptation_blob.cache_clear()
+            blob = streaming._static_adaptation_blob()
+            self.assertEqual(self._phrase_count(blob), len(terms))
+            self.assertEqual(path.read_bytes(), blob)
+        self.assertEqual(list(path.parent.glob("*.tmp")), [])
+
+
+class _FakeSpeechClient:
+    """SpeechAsyncClient stand-in that records the audio each session receives.
+
+    Sessions listed in fail_sessions raise after their config request, before
+    reading any audio.
+    """
+
+    fail_sessions = set()
+
+    def __init__(self, client_options=None):
+        self.sessions = []
+        self.closed = []
+        _FakeSpeechClient.instance = self
+
+    async def streaming_recognize(self, requests):
+        index = len(self.sessions)
+        received = []
+        self.sessions.append(received)
+        return self._responses(index, requests, received)
+
+    async def _responses(self, index, requests, received):
+        import asyncio
+        from google.cloud.speech_v2.types import cloud_speech
+
+        async for request in requests:
+            if request.audio:
+                received.append(request.audio)
+                yield cloud_speech.StreamingRecognizeResponse()
+            elif index in self.fail_sessions:
+                await asyncio.sleep(0.2)  # let the pump queue audio for us
+                raise RuntimeError("stream reset")
+        self.closed.append(index)
+
+
+class TestStreamingHotSwap(unittest.TestCase):
+    """Google STT session handover and error recovery with a fake client."""
+
+    def setUp(self):
+        import queue
+        from stt import streaming
+        from google.cloud.speech_v2.types import cloud_speech
+
+        config = SimpleNamespace(
+            gcp_region="us", gcp_project_id="test", stt_language_codes=["ko-KR"],
+            stt_model="chirp_3", stt_stream_timeout_sec=300,
+        )
+        _FakeSpeechClient.fail_sessions = set()
+        self.audio = queue.Queue()
+        self.errors = []
+        self.stt = streaming.StreamingSTT(
+            config, self.audio, lambda *a, **kw: None, on_error=self.errors.append,
+        )
+        for target, name, value in (
+            (streaming, "SpeechAsyncClient", _FakeSpeechClient),
+            (self.stt, "_build_phrase_set", cloud_speech.SpeechAdaptation),
+        ):
+            patcher = patch.object(target, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.stt.stop)
+
+    def _until(self, predicate, timeout=3.0):
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            if time.monotonic() > deadline:
+                self.fail("condition not met in time")
+            time.sleep(0.01)
+
+    def test_force_restart_hands_audio_to_new_session(self):
+        self.stt.start()
+        self.audio.put(b"one")
+        self._until(lambda: _FakeSpeechClient.instance.sessions[0] == [b"one"])
+
+        self.stt.force_restart(terms_changed=True)
+        client = _FakeSpeechClient.instance
+        self._until(lambda: len(client.sessions) == 2)
+        self.audio.put(b"two")
+        self._until(lambda: client.sessions[1] == [b"two"])
+        self._until(lambda: client.closed == [0])
+        self.assertEqual(client.sessions[0], [b"one"])
+        self.assertEqual(self.errors, [])
+
+    def test_failed_session_audio_replayed(self):
+        _FakeSpeechClient.fail_sessions = {0}
+        self.audio.put(b"lost?")
+        self.stt.start()
+        self._until(lambda: len(self.errors) == 1)
+        client = _FakeSpeechClient.instance
+        self._until(lambda: len(client.sessions) == 2 and client.sessions[1] == [b"lost?"])
+        self.assertEqual(client.sessions[0], [])
+
+
 class TestDeepgramURL(unittest.TestCase):
     """Test Deepgram URL building (no keyword boosting)."""
 
-    def _make_stt(self):
+    @classmethod
+    def setUpClass(cls):
         config = MagicMock()
         config.deepgram_api_key = "test_key"
         from stt.deepgram_streaming import DeepgramStreamingSTT
-        return DeepgramStreamingSTT(
+        cls.stt = DeepgramStreamingSTT(
             config, MagicMock(), lambda *a, **kw: None,
             sample_rate=48000,
         )
 
     def test_url_contains_words_true(self):
-        stt = self._make_stt()
-        url = stt._build_url()
+        url = self.stt._build_url()
         self.assertIn("words=true", url)
 
     def test_url_no_keywords(self):
-        stt = self._make_stt()
-        url = stt._build_url()
+        url = self.stt._build_url()
         self.assertNotIn("keywords=", url)
 
 
 class TestDeepgramMessageParsing(unittest.TestCase):
     """Test Deepgram WebSocket message parsing with word timestamps."""
 
-    def _make_stt(self):
+    @classmethod
+    def setUpClass(cls):
         config = MagicMock()
         config.deepgram_api_key = "test_key"
-        self.received = []
+        cls.received = []
 
         def on_transcript(text, is_final, words=None, confidence=1.0):
-            self.received.append({
+            cls.received.append({
                 "text": text, "is_final": is_final,
                 "words": words, "confidence": confidence,
             })
 
         from stt.deepgram_streaming import DeepgramStreamingSTT
-        stt = DeepgramStreamingSTT(
+        cls.stt = DeepgramStreamingSTT(
             config, MagicMock(), on_transcript, sample_rate=48000,
         )
-        stt._stream_start_mono = 1000.0
-        return stt
+
+    def setUp(self):
+        self.received.clear()
+        self.stt._stream_start_mono = 1000.0
 
     def test_final_with_words(self):
         """Parse a Deepgram final message with word timestamps."""
         import json
-        stt = self._make_stt()
+        stt = self.stt
 
         msg = json.dumps({
             "is_final": True,
@@ -435,7 +721,7 @@ class TestDeepgramMessageParsing(unittest.TestCase):
     def test_interim_without_words(self):
         """Parse an interim message (typically no words)."""
         import json
-        stt = self._make_stt()
+        stt = self.stt
 
         msg = json.dumps({
             "is_final": False,
@@ -456,7 +742,7 @@ class TestDeepgramMessageParsing(unittest.TestCase):
     def test_empty_transcript_ignored(self):
         """Empty transcript in message should be ignored."""
         import json
-        stt = self._make_stt()
+        stt = self.stt
 
         msg = json.dumps({
             "is_final": True,
@@ -471,10 +757,31 @@ class TestDeepgramMessageParsing(unittest.TestCase):
         stt._on_message(None, msg)
         self.assertEqual(len(self.received), 0)
 
+    def test_bytes_frame(self):
+        """Undecoded UTF-8 frames (skip_utf8_validation) parse the same as str."""
+        import json
+        stt = self.stt
+
+        msg = json.dumps({
+            "is_final": True,
+            "channel": {
+                "alternatives": [{
+                    "transcript": "골밀도 감소",
+                    "confidence": 0.9,
+                    "words": [{"word": "골밀도", "start": 1.0, "end": 1.5}],
+                }],
+            },
+        }, ensure_ascii=False).encode("utf-8")
+
+        stt._on_message(None, msg)
+        self.assertEqual(len(self.received), 1)
+        self.assertEqual(self.received[0]["text"], "골밀도 감소")
+        self.assertEqual(self.received[0]["words"][0][0], "골밀도")
+
     def test_before_connection_no_words(self):
         """If stream_start_mono is 0, words should be None."""
         import json
-        stt = self._make_stt()
+        stt = self.stt
         stt._stream_start_mono = 0
 
         msg = json.dumps({
@@ -493,16 +800,13 @@ class TestDeepgramMessageParsing(unittest.TestCase):
         self.assertIsNone(self.received[0]["words"])
 
 
-class TestRefinerBufferEdgeCases(unittest.TestCase):
+class TestRefinerBufferEdgeCases(_RefinedWaiter, unittest.TestCase):
     """Edge case tests for RefinerBuffer."""
 
     def _make_buffer(self, **kwargs):
         refiner = MagicMock()
         refiner.refine.return_value = "refined"
-        results = []
-
-        def on_refined(text, slide_idx):
-            results.append((text, slide_idx))
+        results, on_refined = self._record_refined()
 
         from stt.refiner import RefinerBuffer
         buf = RefinerBuffer(
@@ -513,29 +817,30 @@ class TestRefinerBufferEdgeCases(unittest.TestCase):
 
     def test_rapid_slide_changes(self):
         """Buffer handles rapid slide changes (flush between each)."""
-        buf, refiner, results = self._make_buffer(max_segments=10)
+        buf, refiner, results = self._make_buffer()
 
         buf.add("text0", 0)
         buf.add("text1", 1)
         buf.add("text2", 2)
-        time.sleep(0.5)
+        self._wait_refined(2)
 
         self.assertGreaterEqual(len(results), 2)
 
     def test_refiner_failure_returns_original(self):
         """When refiner fails, original text is returned."""
-        buf, refiner, results = self._make_buffer(max_segments=1)
+        buf, refiner, results = self._make_buffer()
         refiner.refine.side_effect = Exception("API error")
 
         buf.add("original text", 0)
-        time.sleep(0.3)
+        buf.flush()
+        self._wait_refined()
 
         self.assertEqual(len(results), 1)
         self.assertEqual(results[0][0], "original text")
 
     def test_concurrent_adds(self):
         """Multiple threads adding to buffer simultaneously."""
-        buf, refiner, results = self._make_buffer(max_segments=5)
+        buf, refiner, results = self._make_buffer(flush_interval_sec=0.05)
         errors = []
 
         def add_items(batch):
@@ -553,26 +858,329 @@ class TestRefinerBufferEdgeCases(unittest.TestCase):
             t.join()
 
         buf.flush()
-        time.sleep(0.5)
+        self.assertTrue(buf.wait_pending(timeout=2.0))
 
         self.assertEqual(len(errors), 0)
         self.assertGreater(len(results), 0)
 
 
+def _make_refiner(chunks=()):
+    """TranscriptRefiner with mocked clients; sync completions stream ``chunks``."""
+    from stt.refiner import TranscriptRefiner
+    refiner = TranscriptRefiner.__new__(TranscriptRefiner)
+    refiner.client = MagicMock()
+    refiner.model = "test-model"
+    refiner.anthropic = None
+    refiner.anthropic_model = None
+    refiner.async_client = MagicMock()
+    refiner.async_anthropic = None
+    refiner.max_concurrency = 2
+    refiner._loop = None
+    refiner._lock = threading.Lock()
+    refiner._response_cache = OrderedDict()
+    refiner._enc = None
+    refiner._enc_requested = True
+    refiner.local_shortcut = False
+
+    stream = MagicMock()
+    stream.__iter__.return_value = [
+        MagicMock(choices=[MagicMock(delta=MagicMock(content=c))])
+        for c in chunks
+    ]
+    refiner.client.chat.completions.create.return_value = stream
+    return refiner, stream
+
+
+class TestRefinerHttpClient(unittest.TestCase):
+    """Both SDKs share one pooled httpx client; only streams get the short timeout."""
+
+    def test_clients_share_pool_with_sdk_default_timeout(self):
+        from stt import refiner as refiner_mod
+        config = SimpleNamespace(
+            openai_api_key="sk", openai_model_writer="m", refiner_max_concurrency=2,
+            refiner_local_shortcut=False, anthropic_api_key="ak", anthropic_model="c",
+        )
+        sdks = {
+            name: MagicMock()
+            for name in ("OpenAI", "AsyncOpenAI", "Anthropic", "AsyncAnthropic")
+        }
+        with patch.multiple(refiner_mod, **sdks):
+            refiner = refiner_mod.TranscriptRefiner(config)
+
+        for name in ("OpenAI", "Anthropic"):
+            self.assertIs(sdks[name].call_args.kwargs["http_client"], refiner._http)
+        for name in ("AsyncOpenAI", "AsyncAnthropic"):
+            self.assertIs(sdks[name].call_args.kwargs["http_client"], refiner._async_http)
+        self.assertEqual(refiner._http.timeout.read, refiner_mod.HTTP_TIMEOUT_SEC)
+        self.assertEqual(refiner._async_http.timeout.read, 600.0)
+        self.assertEqual(refiner._http.timeout.connect, refiner_mod.HTTP_CONNECT_TIMEOUT_SEC)
+
+    def test_streams_use_short_timeout(self):
+        from stt.refiner import STREAM_TIMEOUT
+        refiner, _ = _make_refiner(["ok"])
+        refiner.refine("티 스코어")
+        kwargs = refiner.client.chat.completions.create.call_args.kwargs
+        self.assertIs(kwargs["timeout"], STREAM_TIMEOUT)
+        self.assertEqual(STREAM_TIMEOUT.read, 60.0)
+
+
+class TestRefinerStreaming(unittest.TestCase):
+    """Streaming completions and the streamed length guard."""
+
+    def test_polish_stream_yields_chunks(self):
+        refiner, _ = _make_refiner(["골밀도가 ", None, "감소함"])
+        chunks = list(refiner.polish_stream("골밀도가 감소합니다"))
+        self.assertEqual(chunks, ["골밀도가 ", "감소함"])
+        kwargs = refiner.client.chat.completions.create.call_args.kwargs
+        self.assertTrue(kwargs["stream"])
+
+    def test_finalize_joins_stream(self):
+        refiner, _ = _make_refiner(["hello ", "world"])
+        self.assertEqual(refiner.finalize("hello world"), "hello world")
+
+    def test_polish_aborts_when_too_long(self):
+        refiner, stream = _make_refiner(["x" * 20] * 10)
+        self.assertEqual(refiner.polish("short"), "short")
+        stream.close.assert_called()
+
+
+class TestRefinerResponseCache(unittest.TestCase):
+    """Reuse of refine results for repeated input."""
+
+    def test_refine_cache_hit_skips_api(self):
+        refiner, _ = _make_refiner(["T-score 감소"])
+        first = refiner.refine("티 스코어 감소", "Title: DEXA")
+        second = refiner.refine("티 스코어   감소", "Title: DEXA")
+        self.assertEqual(first, second)
+        self.assertEqual(refiner.client.chat.completions.create.call_count, 1)
+
+    def test_cache_requires_exact_text_and_context(self):
+        """Lines differing by one numeral, or on another slide, never share a result."""
+        refiner, _ = _make_refiner(["refined"])
+        text = "비스포스포네이트는 하루 영 점 오 밀리그램을 투여하고 골밀도를 다시 측정합니다"
+        refiner.refine(text, "slide 1")
+        self.assertIsNotNone(refiner._cache_get("refine", text, "slide 1"))
+        self.assertIsNone(refiner._cache_get("refine", text, "slide 2"))
+        refiner.refine(text.replace("영 점 오", "영 점 삼"), "slide 1")
+        self.assertEqual(refiner.client.chat.completions.create.call_count, 2)
+
+
+class TestRefinerPromptWarmup(unittest.TestCase):
+    """Prompt-cache warm-up before capture."""
+
+    def test_warm_prompt_cache_sends_refine_prompt_only(self):
+        from stt.refiner import REFINE_PROMPT
+        refiner, _ = _make_refiner()
+        refiner.warm_prompt_cache()
+        create = refiner.client.chat.completions.create
+        create.assert_called_once()
+        self.assertEqual(create.call_args.kwargs["messages"][0]["content"], REFINE_PROMPT)
+
+
+class TestRefinerOutputBudget(unittest.TestCase):
+    """max_tokens sizing from the input length."""
+
+    def test_encoder_loads_in_background(self):
+        """The first budget falls back to chars while tiktoken loads off-thread."""
+        refiner, _ = _make_refiner()
+        refiner._enc_requested = False
+        release = threading.Event()
+        enc = MagicMock(**{"encode.return_value": [0] * 100})
+
+        def slow_load(model):
+            release.wait(timeout=2.0)
+            return enc
+
+        fake_tiktoken = MagicMock(**{"encoding_for_model.side_effect": slow_load})
+        with patch("stt.refiner.tiktoken", fake_tiktoken):
+            self.assertEqual(refiner._output_budget("x" * 400, 1.2, 1.5, 200, 1000), 600)
+            release.set()
+            deadline = time.monotonic() + 2.0
+            while refiner._enc is None and time.monotonic() < deadline:
+                time.sleep(0.01)
+        self.assertEqual(refiner._output_budget("x" * 400, 1.2, 1.5, 200, 1000), 184)
+        fake_tiktoken.encoding_for_model.assert_called_once_with("test-model")
+
+    def test_output_budget_uses_token_count(self):
+        refiner, _ = _make_refiner()
+        self.assertEqual(refiner._output_budget("x" * 400, 1.2, 1.5, 200, 1000), 600)
+        refiner._enc = MagicMock()
+        refiner._enc.encode.return_value = [0] * 100
+        self.assertEqual(refiner._output_budget("x" * 400, 1.2, 1.5, 200, 1000), 184)
+
+
+class TestRefinerLocalShortcut(unittest.TestCase):
+    """Skipping the LLM for text that needs no fixes."""
+
+    def test_plain_korean_skips_api(self):
+        refiner, _ = _make_refiner(["unused"])
+        refiner.local_shortcut = True
+        result = refiner.refine("골밀도가. 감소하면 골절 위험이 증가합니다..")
+        self.assertEqual(result, "골밀도가 감소하면 골절 위험이 증가합니다.")
+        refiner.client.chat.completions.create.assert_not_called()
+
+    def test_local_fixups_keep_decimals(self):
+        from stt.refiner import _apply_local_fixups
+        self.assertEqual(
+            _apply_local_fixups("환자는. 하루 3.5 mg을. 투여하고 0.5 kg이 늘었습니다.."),
+            "환자는 하루 3.5 mg을 투여하고 0.5 kg이 늘었습니다.",
+        )
+
+    def test_local_shortcut_off_by_default(self):
+        """Without the flag, plain-looking Korean (e.g. 골프지자) still goes to the LLM."""
+        from config import Config
+        self.assertFalse(Config().refiner_local_shortcut)
+        refiner, _ = _make_refiner(["골표지자 검사를 합니다"])
+        self.assertEqual(refiner.refine("골프지자 검사를 합니다"), "골표지자 검사를 합니다")
+        refiner.client.chat.completions.create.assert_called_once()
+
+    def test_transliteration_needs_api(self):
+        from stt.refiner import _local_refine
+        self.assertIsNone(_local_refine("오스테오포로시스 환자", ""))
+        self.assertIsNone(_local_refine("이십 오 퍼센트", ""))
+        self.assertIsNone(_local_refine("환자가 백 명이었습니다", ""))
+        self.assertIsNone(_local_refine("이천 개의 샘플", ""))
+        self.assertIsNone(_local_refine(
+            "골표지자 검사", "Korean phonetic → English mappings:\n  골표지자 → BTM",
+        ))
+
+
+class TestRefinerBatch(unittest.TestCase):
+    """Several flushes refined in one request."""
+
+    def test_refine_batch_splits_sections(self):
+        refiner, _ = _make_refiner()
+        response = MagicMock()
+        response.choices[0].message.content = "### BATCH 1\nCTX 수치\n### BATCH 2\nDEXA 검사"
+        refiner.client.chat.completions.create.return_value = response
+
+        result = refiner.refine_batch([("씨티엑스 수치", "a"), ("덱사 검사", "b")])
+        self.assertEqual(result, ["CTX 수치", "DEXA 검사"])
+
+    def test_refine_batch_mismatch_returns_none(self):
+        refiner, _ = _make_refiner()
+        response = MagicMock()
+        response.choices[0].message.content = "### BATCH 1\nonly one"
+        refiner.client.chat.completions.create.return_value = response
+
+        self.assertIsNone(refiner.refine_batch([("a", ""), ("b", "")]))
+
+
+class TestPolishBatch(unittest.TestCase):
+    """End-of-lecture polishing through the Batch API."""
+
+    def test_polish_batch_maps_openai_results(self):
+        import json
+        refiner, _ = _make_refiner()
+        batch = MagicMock(id="b1", status="completed", output_file_id="out")
+        refiner.client.batches.create.return_value = batch
+        output = "\n".join(json.dumps({
+            "custom_id": cid,
+            "response": {"status_code": 200, "body": {
+                "choices": [{"message": {"content": text}}],
+            }},
+        }) for cid, text in [("2", "second polished"), ("0", "first polished")])
+        refiner.client.files.content.return_value = MagicMock(text=output)
+
+        result = refiner.polish_batch([("first slide", ""), ("", ""), ("second slide", "")])
+
+        self.assertEqual(result, ["first polished", "", "second polished"])
+        refiner.client.chat.completions.create.assert_not_called()
+
+    def test_polish_batch_failure_falls_back(self):
+        refiner, _ = _make_refiner(["polished"])
+        refiner.client.files.create.side_effect = RuntimeError("boom")
+
+        self.assertEqual(refiner.polish_batch([("raw text", "")]), ["polished"])
+
+    def test_polish_batch_realtime_skips_batch_api(self):
+        refiner, _ = _make_refiner(["polished"])
+
+        self.assertEqual(refiner.polish_batch([("raw text", "")], realtime=True), ["polished"])
+        refiner.client.files.create.assert_not_called()
+
+
+class TestPolishAndSummarize(unittest.TestCase):
+    """Per-slide polish and summary."""
+
+    def test_polish_and_summarize_all_chains_per_slide(self):
+        """Each slide is summarized from its polished text; order is preserved."""
+        refiner, _ = _make_refiner()
+        in_flight = []
+        peak = []
+
+        class FakeStream:
+            def __init__(self, text):
+                self._chunks = [MagicMock(choices=[MagicMock(delta=MagicMock(content=text))])]
+
+            def __aiter__(self):
+                return self._iter()
+
+            async def _iter(self):
+                for chunk in self._chunks:
+                    yield chunk
+
+            async def close(self):
+                pass
+
+        async def create(**kwargs):
+            import asyncio
+            in_flight.append(1)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.pop()
+            user = kwargs["messages"][-1]["content"].splitlines()[-1]
+            if kwargs.get("stream"):
+                return FakeStream(f"polished {user}")
+            return MagicMock(choices=[MagicMock(message=MagicMock(content=f"- {user}"))])
+
+        refiner.async_client.chat.completions.create = create
+
+        texts = [f"slide {name} " + "골밀도 감소 " * 100 for name in ("zero", "one", "two")]
+        result = refiner.polish_and_summarize_all(
+            [(i, text, "") for i, text in enumerate(texts)]
+        )
+
+        self.assertEqual([polished for polished, _ in result],
+                         [f"polished {text}".strip() for text in texts])
+        self.assertEqual(result[1][1], [f"polished {texts[1]}".strip()])
+        self.assertLessEqual(max(peak), 2)
+
+    def test_run_async_times_out_and_cancels(self):
+        """A coroutine that never finishes is cancelled instead of blocking forever."""
+        import asyncio
+        refiner, _ = _make_refiner()
+        cancelled = threading.Event()
+
+        async def wedged():
+            try:
+                await asyncio.sleep(3600)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with self.assertRaises(TimeoutError):
+            refiner._run_async(wedged(), timeout=0.05)
+        self.assertTrue(cancelled.wait(timeout=2.0))
+
+    def test_summarize_short_transcript_skips_api(self):
+        refiner, _ = _make_refiner()
+
+        self.assertEqual(refiner.summarize("골밀도가 감소함"), [])
+        medium = "골밀도가 감소하면 골절 위험이 증가합니다. T-score가 -2.5 이하이면 골다공증으로 진단합니다. 치료는 비스포스포네이트를 먼저 사용합니다."
+        self.assertEqual(refiner.summarize(medium), [
+            "골밀도가 감소하면 골절 위험이 증가합니다",
+            "T-score가 -2.5 이하이면 골다공증으로 진단합니다",
+            "치료는 비스포스포네이트를 먼저 사용합니다",
+        ])
+        refiner.client.chat.completions.create.assert_not_called()
+
+
 class TestSlideAssignmentIntegration(unittest.TestCase):
     """Integration tests simulating real slide change + speech patterns."""
 
     def _make_notetaker(self):
-        obj = MagicMock()
-        obj.current_slide = -1
-        obj._slide_timeline = []
-        obj._slide_grace_sec = 5.0
-
-        from main import LectureNotetaker
-        obj._compute_slide_for_utterance = (
-            LectureNotetaker._compute_slide_for_utterance.__get__(obj)
-        )
-        return obj
+        return _fake_notetaker(current_slide=-1)
 
     def test_lecture_sequence(self):
         """Simulate a typical lecture: 3 slides with speech between changes."""